@@ -0,0 +1,134 @@
+## ===== Marketplace export benchmark =====
+## Times the Playwright crawler's ~100-column csv export for a large synthetic dealer:
+## the typed export with blank columns produced at write time, against a frame with every
+## column materialized (how the export used to be built), whole-dealer and streamed in batches
+## the way scrape_dealer writes it. All files must come out identical.
+## Each export runs in a forked child to read its peak resident size (Linux / macOS only).
+##
+##   python benchmarks/bench_export.py
+##   python benchmarks/bench_export.py --rows 200000
+
+import argparse
+import asyncio
+import filecmp
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "id-toko"))
+
+## the id-toko scripts read paramsetting.xlsx from the working directory on import
+os.chdir(ROOT_DIR)
+
+import pandas as pd
+import id_toko_playwright
+
+PROMOTIONS = ["Cashback 5% min. 500rb", "Diskon 50rb min. 1jt", "Gratis Ongkir min. 100rb", "Cashback 10% min. 2jt"]
+CATEGORIES = ["MDR", "LCD TV", "ILC", "LENS"]
+BRANDS = ["SONY", "JBL", "SAMSUNG", "LG", "CANON", "FUJIFILM"]
+
+def make_rows(count, seed):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        price = float(rng.randint(100, 20000) * 1000)
+        rows.append({
+            "Dealer": "ST-Toms",
+            "Category": rng.choice(CATEGORIES),
+            "Position": i % 80 + 1,
+            "Position Out Of": 80,
+            "Brand": rng.choice(BRANDS),
+            "Material Description": f'{rng.choice(BRANDS)} Product "{i}" - Garansi Resmi',
+            "Link": f"https://www.tokopedia.com/st-toms/product-{i}",
+            "Promotions": rng.sample(PROMOTIONS, rng.randint(0, 4)),
+            "Original Price": price,
+            "Final Price": price * rng.choice([1, 0.95, 0.9]),
+            "Stock": rng.randint(0, 1),
+            "Average Review": rng.choice([None, 4.8, 49.0]),
+            "Total Review": rng.randint(0, 2000),
+            "Created On": "2026-10-18 08:00:00",
+        })
+    return rows
+
+## ===== Export paths =====
+
+def export_materialized(rows, filename):
+    df = pd.DataFrame(rows)
+    for i in range(1, id_toko_playwright.MAX_PROMOTIONS + 1):
+        df[f"promotion_text_{i}"] = df["Promotions"].apply(lambda x: x[i - 1] if i - 1 < len(x) else "")
+    df = df.drop(columns=["Promotions"]).rename(columns=id_toko_playwright.EXPORT_COLUMN_MAPPING)
+    for col in id_toko_playwright.EXPORT_COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+    df = df[id_toko_playwright.EXPORT_COLUMNS]
+    df.to_csv(filename, sep="|", index=False, encoding="utf-8", header=True, quotechar='"', quoting=1)
+
+def export_typed(rows, filename):
+    id_toko_playwright.write_export(id_toko_playwright.export_frame(rows), filename, header=True)
+
+def export_streamed(rows, filename):
+    ## what scrape_dealer does: rows handed over one by one as products finish
+    async def stream():
+        writer = id_toko_playwright.ExportWriter("bench", filename=filename)
+        for row in rows:
+            writer.append(row)
+        await writer.close()
+
+    asyncio.run(stream())
+
+def measure(func, rows, filename, results):
+    ## runs in a forked child, so the peak resident size only reflects this export
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    try:
+        func(rows, filename)
+    except Exception as e:
+        results.put(e)
+        raise
+    elapsed = time.perf_counter() - start
+    results.put([elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline])
+
+def run_case(name, func, rows, filename):
+    results = multiprocessing.get_context("fork").Queue()
+    child = multiprocessing.get_context("fork").Process(target=measure, args=(func, rows, filename, results))
+    child.start()
+    result = results.get()
+    child.join()
+    if isinstance(result, Exception):
+        raise result
+    elapsed, peak_kib = result
+
+    print(f"{name:<14} {elapsed:>10.2f} {peak_kib / 1024:>12,.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Marketplace csv export benchmark")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.seed)
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        ## ExportWriter makes the dated export folder in the working directory
+        os.chdir(scratch_dir)
+        materialized = os.path.join(scratch_dir, "materialized.csv")
+        typed = os.path.join(scratch_dir, "typed.csv")
+        streamed = os.path.join(scratch_dir, "streamed.csv")
+
+        print(f"rows: {args.rows:,}")
+        print(f"{'export':<14} {'seconds':>10} {'peak RSS MiB':>12}")
+        run_case("materialized", export_materialized, rows, materialized)
+        run_case("typed", export_typed, rows, typed)
+        run_case("streamed", export_streamed, rows, streamed)
+        identical = all(filecmp.cmp(materialized, other, shallow=False) for other in [typed, streamed])
+        print(f"identical output: {identical}")
+        os.chdir(ROOT_DIR)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+## ===== Masterlist matching benchmark =====
+## Times the NEW / MISSING partial matching of validate_masterlist on a synthetic masterlist,
+## against the old pairwise any() scan (run on a sample and extrapolated, the full scan takes hours).
+##
+##   python benchmarks/bench_masterlist.py
+##   python benchmarks/bench_masterlist.py --rows 20000 --sample 500
+
+import argparse
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "id-toko"))
+
+from toko_common import PartialMatcher
+
+DEALERS = ["Sony Official Store", "itoms", "ST-Toms", "Erafone", "Electronic City", "Global Teleshop", "Urban Republic"]
+BRANDS = ["SONY", "JBL", "Sennheiser", "Audio Technica", "Samsung", "LG", "Canon", "Fujifilm", "Anker", "Edifier"]
+WORDS = ["Wireless", "Headphone", "Earbuds", "Noise", "Cancelling", "Bluetooth", "Smart", "TV", "4K", "UHD",
+         "Mirrorless", "Camera", "Lens", "Speaker", "Portable", "Garansi", "Resmi", "Black", "White", "Silver"]
+
+## ===== Synthetic data =====
+
+def material(rng, index):
+    words = rng.sample(WORDS, rng.randint(3, 7))
+    model = f"{rng.choice('ABCDEFGHKMSWX')}{rng.choice('HKMSX')}-{index:06d}"
+    return " ".join([rng.choice(BRANDS)] + words[:2] + [model] + words[2:])
+
+def make_lists(rows, seed):
+    """A masterlist of `rows` entries and a day's crawl overlapping ~90% of it, with renamed and new products."""
+    rng = random.Random(seed)
+    masterlist = [f"{rng.choice(DEALERS)} - {material(rng, i)}" for i in range(rows)]
+
+    today = []
+    for entry in masterlist:
+        roll = rng.random()
+        if roll < 0.80:
+            today.append(entry)
+        elif roll < 0.85:
+            today.append(entry + " - Free Gift")                ## title grew, still a partial match
+        elif roll < 0.90:
+            today.append(entry[:max(12, len(entry) - 15)])       ## title shrank, still a partial match
+    today += [f"{rng.choice(DEALERS)} - {material(rng, rows + i)}" for i in range(rows // 10)]
+    rng.shuffle(today)
+    return masterlist, today
+
+## ===== Matchers =====
+
+def is_partial_match(link, masterlist_links):
+    return any(masterlink in link or link in masterlink for masterlink in masterlist_links)
+
+def run_indexed(masterlist, today):
+    masterlist_matcher = PartialMatcher(masterlist)
+    today_matcher = PartialMatcher(today)
+    new = [link for link in today if not masterlist_matcher.matches(link)]
+    missing = [link for link in masterlist if not today_matcher.matches(link)]
+    return new, missing
+
+def main():
+    parser = argparse.ArgumentParser(description="Masterlist NEW / MISSING matching benchmark")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=200, help="queries timed with the pairwise scan")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    masterlist, today = make_lists(args.rows, args.seed)
+    print(f"masterlist rows: {len(masterlist):,}, today rows: {len(today):,}")
+
+    start = time.perf_counter()
+    new, missing = run_indexed(masterlist, today)
+    indexed_seconds = time.perf_counter() - start
+    print(f"indexed:  {indexed_seconds:>10.2f}s  NEW {len(new):,}  MISSING {len(missing):,}")
+
+    ## the pairwise scan on a sample of queries from both directions, checked against the index
+    rng = random.Random(args.seed)
+    today_sample = rng.sample(today, min(args.sample, len(today)))
+    masterlist_sample = rng.sample(masterlist, min(args.sample, len(masterlist)))
+    new_set, missing_set = set(new), set(missing)
+
+    start = time.perf_counter()
+    mismatches = 0
+    for link in today_sample:
+        mismatches += (not is_partial_match(link, masterlist)) != (link in new_set)
+    for link in masterlist_sample:
+        mismatches += (not is_partial_match(link, today)) != (link in missing_set)
+    pairwise_seconds = time.perf_counter() - start
+
+    sampled = len(today_sample) + len(masterlist_sample)
+    projected = pairwise_seconds / sampled * (len(today) + len(masterlist))
+    print(f"pairwise: {projected:>10.2f}s  (projected from {sampled:,} queries in {pairwise_seconds:.2f}s)")
+    print(f"speed-up: {projected / indexed_seconds:,.0f}x, sample mismatches: {mismatches}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+## ===== Parser micro-benchmarks =====
+## Times the parsers against the saved pages in benchmarks/fixtures, fully offline.
+##
+##   python benchmarks/bench_parsers.py
+##   python benchmarks/bench_parsers.py --backend html.parser --repeat 50
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "sg-courts"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "id-toko"))
+
+## the id-toko scripts read paramsetting.xlsx from the working directory on import
+os.chdir(ROOT_DIR)
+
+import setup as courts_setup
+import sg_courts_parse
+import toko_common
+import id_toko
+import id_toko_playwright
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+## ===== Benchmark cases =====
+## each case returns the number of products it produced
+
+def bench_courts_parse(html):
+    pages = [[courts_setup.make_soup(html, courts_setup.COURTS_LISTING_NODES).find_all("li", class_="item product product-item"), "LCD TV"]]
+    courts_setup.initialise_df()
+    return len(sg_courts_parse.parse(pages))
+
+def bench_toko_parse_cat_page(html):
+    soup = toko_common.make_soup(html, toko_common.LISTING_NODES)
+    scraped = {"https://www.tokopedia.com/itoms/etalase/audio/page/": soup.find_all("div", class_="css-1sn1xa2")}
+    return len(id_toko.parse_cat_page(scraped, "ST-Toms", "MDR"))
+
+def bench_toko_scrape_page(html, variants=1):
+    ## the Selenium crawler reads page_source once per selected variant
+    records = toko_common.RecordAccumulator(id_toko.DATA_COLUMNS)
+    for _ in range(variants):
+        pdp = toko_common.read_pdp(html)
+        id_toko.scrape_page(pdp, "MDR", "ST-Toms", "https://www.tokopedia.com/itoms/sony-wh-1000xm5", 1, records)
+    return len(records)
+
+PROMOTIONS = [
+    "Cashback 5% min. 500rb",
+    "Diskon 50rb min. 1jt",
+    "Gratis Ongkir min. 100rb",
+    "Cashback 10% min. 2jt",
+]
+
+def bench_apply_best_promotion(prices):
+    for price in prices:
+        id_toko_playwright.apply_best_promotion(PROMOTIONS, price)
+    return len(prices)
+
+## ===== Runner =====
+
+def run_case(name, func, args, repeat):
+    ## warm-up (also fills the brand matcher cache like a real crawl would)
+    func(*args)
+
+    start = time.perf_counter()
+    products = 0
+    for _ in range(repeat):
+        products += func(*args)
+    elapsed = time.perf_counter() - start
+
+    ## memory of one run, measured around the call: the peak above what was traced when it started,
+    ## and the blocks / bytes still allocated once it returned (snapshot diff)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    retained_blocks = sum(stat.count_diff for stat in diff)
+    retained_bytes = sum(stat.size_diff for stat in diff)
+
+    per_run_ms = elapsed / repeat * 1000
+    products_per_sec = products / elapsed if elapsed else float("inf")
+    print(f"{name:<36} {per_run_ms:>10.2f} {products_per_sec:>14,.0f} {(peak - baseline) / 1024:>14,.0f} "
+          f"{retained_blocks:>15,} {retained_bytes / 1024:>13,.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline parser micro-benchmarks")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--backend", choices=["lxml", "html.parser"], help="defaults to the scrapers' own choice")
+    args = parser.parse_args()
+
+    if args.backend:
+        courts_setup.PARSER_BACKEND = args.backend
+        toko_common.PARSER_BACKEND = args.backend
+
+    courts_listing = load_fixture("courts_listing.html")
+    toko_listing = load_fixture("toko_listing.html")
+    toko_pdp = load_fixture("toko_pdp.html")
+    toko_pdp_variants = load_fixture("toko_pdp_variants.html")
+    prices = [float(p) for p in range(100000, 10000000, 1000)]
+
+    cases = [
+        ("sg_courts_parse.parse", bench_courts_parse, (courts_listing,)),
+        ("id_toko.parse_cat_page", bench_toko_parse_cat_page, (toko_listing,)),
+        ("id_toko.scrape_page (no variants)", bench_toko_scrape_page, (toko_pdp,)),
+        ("id_toko.scrape_page (3x2 variants)", bench_toko_scrape_page, (toko_pdp_variants, 6)),
+        ("apply_best_promotion", bench_apply_best_promotion, (prices,)),
+    ]
+
+    print(f"backend: courts={courts_setup.PARSER_BACKEND} toko={toko_common.PARSER_BACKEND}, repeat={args.repeat}")
+    print(f"{'case':<36} {'ms/run':>10} {'products/sec':>14} {'call peak KiB':>14} {'retained blocks':>15} {'retained KiB':>13}")
+    for name, func, case_args in cases:
+        run_case(name, func, case_args, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+## ===== End-to-end crawl load test =====
+## Runs a crawler engine against benchmarks/replay_server.py and reports throughput and the
+## per-page latency the crawler sees (timed around each page fetch in the engine), without
+## touching the real sites. Browser engines need Chrome / Playwright.
+##
+##   python benchmarks/load_test.py courts-http --pages 10 --latency 150 --jitter 100
+##   python benchmarks/load_test.py toko-playwright --pages 2 --unreachable-rate 0.05
+
+import argparse
+import asyncio
+import csv
+import glob
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "sg-courts"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "id-toko"))
+
+import replay_server
+
+TOKO_LISTING_URL = "https://www.tokopedia.com/itoms/etalase/audio/page/"
+
+## ===== Client-side page timing =====
+
+## seconds per page fetch, as the engine saw it
+page_latencies = []
+
+def timed(func):
+    """Wraps an engine's page fetch so every call's duration lands in page_latencies."""
+    if asyncio.iscoroutinefunction(func):
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                page_latencies.append(time.perf_counter() - start)
+    else:
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                page_latencies.append(time.perf_counter() - start)
+    return wrapper
+
+def instrument(engine):
+    """Times the function each engine fetches a page with: request + readiness wait, parsing excluded."""
+    if engine.startswith("courts"):
+        import sg_courts_scrape
+        sg_courts_scrape.fetch_page = timed(sg_courts_scrape.fetch_page)   # HTTP mode
+        sg_courts_scrape.load_page = timed(sg_courts_scrape.load_page)     # browser modes and HTTP fallbacks
+    elif engine == "toko-selenium":
+        from selenium.webdriver.remote.webdriver import WebDriver
+        WebDriver.get = timed(WebDriver.get)
+    else:
+        import id_toko_playwright
+        id_toko_playwright.load_page = timed(id_toko_playwright.load_page)
+
+## ===== Engines =====
+## each engine crawls the replay server and returns the number of product rows it produced (variants included)
+
+def run_courts(mode):
+    import sg_courts_scrape
+    import sg_courts_parse
+
+    return sum(1 for _ in sg_courts_parse.iter_rows(sg_courts_scrape.stream_pages(mode)))
+
+def run_toko_selenium():
+    import id_toko
+
+    scraped = id_toko.scrape_cat_page([TOKO_LISTING_URL])
+    listing = id_toko.parse_cat_page(scraped, "LoadTest", "MDR")
+    return len(id_toko.scrape_product_page(listing, export=False))
+
+def run_toko_playwright():
+    import id_toko_playwright
+
+    ## scrape_dealer writes its csv (and failed_links.txt) under EXPORT_DATE in the working directory
+    os.makedirs(id_toko_playwright.EXPORT_DATE, exist_ok=True)
+    asyncio.run(id_toko_playwright.scrape_dealer("LoadTest", {"MDR": [TOKO_LISTING_URL]}))
+
+    ## scrape_dealer returns the listing results, the exported rows are the ones to compare
+    return sum(count_csv_rows(filename) for filename in glob.glob("**/*_ID_toko_loadtest*.csv", recursive=True))
+
+def count_csv_rows(filename):
+    with open(filename, encoding="utf-8", newline="") as f:
+        return sum(1 for _ in csv.reader(f, delimiter="|")) - 1  # less the header
+
+ENGINES = {
+    "courts-http": lambda: run_courts("http"),
+    "courts-browser": lambda: run_courts("browser"),
+    "courts-pool": lambda: run_courts("pool"),
+    "toko-selenium": run_toko_selenium,
+    "toko-playwright": run_toko_playwright,
+}
+
+## ===== Report =====
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+def print_report(engine, elapsed, products, request_log, page_latencies):
+    served = [x[1] for x in request_log if x[0] != "timeout"]
+    kinds = {}
+    for kind, _ in request_log:
+        kinds[kind] = kinds.get(kind, 0) + 1
+
+    print()
+    print("+--------------------------------+")
+    print(f"Engine: {engine}")
+    print(f"Wall clock: {elapsed:.2f}s")
+    print(f"Requests: {len(request_log)} ({len(request_log) / elapsed:.1f}/s)")
+    for kind in sorted(kinds):
+        print(f"  {kind}: {kinds[kind]}")
+    print(f"Products: {products} ({products / elapsed:.1f}/s)")
+    print(f"Page latency, client side (ms, {len(page_latencies)} pages): p50 {percentile(page_latencies, 50) * 1000:.0f}, "
+          f"p95 {percentile(page_latencies, 95) * 1000:.0f}, p99 {percentile(page_latencies, 99) * 1000:.0f}, "
+          f"max {max(page_latencies, default=0) * 1000:.0f}")
+    print(f"Replay server handling time per request (ms): p50 {percentile(served, 50) * 1000:.0f}, "
+          f"p95 {percentile(served, 95) * 1000:.0f}, p99 {percentile(served, 99) * 1000:.0f}, "
+          f"max {max(served, default=0) * 1000:.0f}")
+    print("+--------------------------------+")
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl the local replay server and measure throughput")
+    parser.add_argument("engine", choices=list(ENGINES))
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0, help="ms")
+    parser.add_argument("--jitter", type=float, default=0, help="ms")
+    parser.add_argument("--timeout-rate", type=float, default=0)
+    parser.add_argument("--timeout-seconds", type=float, default=30)
+    parser.add_argument("--unreachable-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = replay_server.start_server(
+        pages=args.pages, latency=args.latency, jitter=args.jitter, timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds, unreachable_rate=args.unreachable_rate, seed=args.seed,
+    )
+
+    ## the id-toko scripts read paramsetting.xlsx from the working directory on import
+    os.chdir(ROOT_DIR)
+    import setup as courts_setup
+    import toko_common
+    courts_setup.COURTS_BASE_URL = server.base_url
+    toko_common.TOKO_BASE_URL = server.base_url
+
+    ## anything the crawlers export lands in a scratch directory
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        if args.engine.startswith("toko"):
+            ## importing the crawler module first so it still finds paramsetting.xlsx
+            __import__("id_toko" if args.engine == "toko-selenium" else "id_toko_playwright")
+        os.chdir(scratch_dir)
+        instrument(args.engine)
+
+        start = time.perf_counter()
+        products = ENGINES[args.engine]()
+        elapsed = time.perf_counter() - start
+
+        os.chdir(ROOT_DIR)
+
+    server.shutdown()
+    print_report(args.engine, elapsed, products, server.request_log, page_latencies)
+
+if __name__ == "__main__":
+    main()
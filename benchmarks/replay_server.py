@@ -0,0 +1,161 @@
+## ===== Local replay server =====
+## Serves the saved pages in benchmarks/fixtures as a stand-in for Courts and Tokopedia,
+## with optional latency, timeouts and "This site can't be reached" pages.
+##
+##   python benchmarks/replay_server.py --port 8800 --pages 5 --latency 200 --unreachable-rate 0.05
+##
+## then point a crawler at it with COURTS_BASE_URL / TOKO_BASE_URL=http://127.0.0.1:8800
+
+import argparse
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+## what Chrome leaves in page_source when a site can't be reached, the crawlers look for these lines
+UNREACHABLE_PAGE = """<html><body><div id="main-frame-error"><h1>This site can't be reached</h1>
+<p>The web page might be temporarily down or it may have moved permanently to a new web address.</p>
+</div></body></html>"""
+
+def load_fixtures():
+    fixtures = {}
+    for name in os.listdir(FIXTURES_DIR):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                fixtures[name[:-len(".html")]] = f.read().encode("utf-8")
+    return fixtures
+
+def route(path, query, pages, variant_every):
+    """Maps a request to a fixture name: listing pages up to `pages`, empty state after, anything else is a PDP."""
+
+    ## Courts listing: ...?p=N&product_list_limit=32
+    if "p" in query:
+        page = int(query["p"][0])
+        return "courts_listing" if page <= pages else "courts_listing_empty"
+
+    ## Tokopedia listing: .../etalase/<name>/page/N?perpage=80
+    match = re.search(r"/page/(\d+)/?$", path)
+    if match:
+        page = int(match.group(1))
+        return "toko_listing" if page <= pages else "toko_listing_empty"
+
+    ## Tokopedia PDP, a fixed share of products get the variant page
+    if variant_every and zlib.crc32(path.encode("utf-8")) % variant_every == 0:
+        return "toko_pdp_variants"
+    return "toko_pdp"
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, pages=3, latency=0, jitter=0, timeout_rate=0, timeout_seconds=60,
+                 unreachable_rate=0, variant_every=4, seed=None):
+        super().__init__(address, ReplayHandler)
+        self.fixtures = load_fixtures()
+        self.pages = pages
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.unreachable_rate = unreachable_rate
+        self.variant_every = variant_every
+        self.random = random.Random(seed)
+
+        ## [fixture / fault, seconds spent serving] per request
+        self.request_log = []
+        self.log_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, kind, seconds):
+        with self.log_lock:
+            self.request_log.append([kind, seconds])
+
+class ReplayHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        start = time.perf_counter()
+        server = self.server
+        parts = urlsplit(self.path)
+
+        if parts.path == "/favicon.ico":
+            self.send_error(404)
+            return
+
+        with server.log_lock:
+            roll = server.random.random()
+            delay = max(0, server.latency + server.random.uniform(-server.jitter, server.jitter))
+
+        time.sleep(delay)
+
+        ## hang without answering, the client's own timeout has to kick in
+        if roll < server.timeout_rate:
+            time.sleep(server.timeout_seconds)
+            server.record("timeout", time.perf_counter() - start)
+            self.close_connection = True
+            return
+
+        if roll < server.timeout_rate + server.unreachable_rate:
+            kind = "unreachable"
+            body = UNREACHABLE_PAGE.encode("utf-8")
+        else:
+            kind = route(parts.path, parse_qs(parts.query), server.pages, server.variant_every)
+            body = server.fixtures[kind]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+        server.record(kind, time.perf_counter() - start)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(host="127.0.0.1", port=0, **options):
+    """Starts a ReplayServer on a background thread (port 0 picks a free one) and returns it."""
+    server = ReplayServer((host, port), **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay saved Courts / Tokopedia pages locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--pages", type=int, default=3, help="listing pages per category before the empty state")
+    parser.add_argument("--latency", type=float, default=0, help="added delay per request (ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="+/- random spread on the delay (ms)")
+    parser.add_argument("--timeout-rate", type=float, default=0, help="share of requests that never answer")
+    parser.add_argument("--timeout-seconds", type=float, default=60)
+    parser.add_argument("--unreachable-rate", type=float, default=0, help="share of requests answered with Chrome's error page")
+    parser.add_argument("--variant-every", type=int, default=4, help="1 in N product pages has variants (0 = none)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        (args.host, args.port), pages=args.pages, latency=args.latency, jitter=args.jitter,
+        timeout_rate=args.timeout_rate, timeout_seconds=args.timeout_seconds,
+        unreachable_rate=args.unreachable_rate, variant_every=args.variant_every, seed=args.seed,
+    )
+    print(f"Replaying fixtures on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+if __name__ == "__main__":
+    main()
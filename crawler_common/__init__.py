@@ -0,0 +1,74 @@
+## ===== Importing Libraries =====
+## Helpers both crawlers use (sg-courts/setup.py and id-toko/toko_common.py import them from here).
+## Installed from the repo root with `pip install -e .`, so the crawler scripts import it like any package.
+
+import functools
+import re
+
+import pandas as pd
+
+## ===== Brand matching =====
+
+## alternative spellings seen in titles / links, lower case
+BRAND_ALIASES = {
+    "AUDIO TECHNICA": ["audio technica", "audio-technica"],
+}
+
+class BrandMatcher:
+    """Finds the first brand (in brand list order) mentioned in a title or link.
+
+    All brand spellings are compiled into one lookahead alternation, so a single
+    regex scan per string finds every brand present; results are memoized since
+    the same titles repeat across variants and reruns.
+    """
+
+    def __init__(self, brands, aliases=None):
+        if aliases is None:
+            aliases = BRAND_ALIASES
+        self.brands = list(brands)
+
+        ## spelling -> position of its brand in the list, earlier brands win
+        self.rank = {}
+        patterns = []
+        for rank, brand in enumerate(self.brands):
+            for spelling in aliases.get(brand, [brand.lower()]):
+                if spelling not in self.rank:
+                    self.rank[spelling] = rank
+                    patterns.append(re.escape(spelling))
+
+        ## alternatives are tried in list order, so at each position the earliest brand matching there is returned
+        self.pattern = re.compile("(?=(" + "|".join(patterns) + "))")
+        self.match = functools.lru_cache(maxsize=16384)(self._match)
+
+    def _match(self, title, link):
+        best = None
+        for text in (title.lower(), link.lower()):
+            for found in self.pattern.finditer(text):
+                rank = self.rank[found.group(1)]
+                if best is None or rank < best:
+                    best = rank
+        return self.brands[best] if best is not None else None
+
+## ===== Row accumulation =====
+
+class RecordAccumulator:
+    """Collects rows into per-column lists and builds the DataFrame once, instead of a concat per row."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.data = [[] for _ in self.columns]
+
+    def __len__(self):
+        return len(self.data[0])
+
+    def append(self, row):
+        ## row is a list in the same order as self.columns
+        for values, value in zip(self.data, row):
+            values.append(value)
+
+    def rows(self, start=0):
+        """The rows appended from position `start` on, as lists."""
+        return [list(row) for row in zip(*(values[start:] for values in self.data))]
+
+    def to_df(self):
+        return pd.DataFrame(dict(zip(self.columns, self.data)), columns=self.columns)
@@ -1,9 +1,11 @@
 ALL_EXPORT = False
+FULL_XLSX_EXPORT = True  ## the day's _FULL.xlsx for the business users, the Parquet dataset is always written
 DEALER_LINKS_FILENAME = "paramsetting.xlsx"
 DEALER_PRODUCT_LIMIT = "?perpage=80"
 
 ## ===== Importing Libraries =====
 
+import json
 import pandas as pd
 import re
 import time
@@ -30,6 +32,14 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from concurrent.futures import ThreadPoolExecutor
 
+import toko_cache
+import toko_dataset
+import toko_delta
+import toko_journal
+import toko_masterlist
+from toko_dataset import DATA_COLUMNS
+from toko_common import RecordAccumulator, BrandMatcher, PartialMatcher, ResourcePolicy, LISTING_NODES, make_soup, print_resource_report, read_pdp, rebase_url
+
 
 ## ===== Pre-scrape functions  =====
 
@@ -83,8 +93,7 @@ dealer_dictionary = get_dealer_links(DEALER_LINKS_FILENAME)
 
 ## ===== Scrapping helper functions =====
 
-def find_brand(title, link, category):
-    category_brand_map = {
+CATEGORY_BRAND_MAP = {
     "LCD TV": ["AIWA", "AOC", "HISENSE", "LG", "PANASONIC", "PHILIPS", "SAMSUNG", "SHARP", "SONY", "TCL", "TOSHIBA", "XIAOMI"],
 
     "HAV": ["LG", "SAMSUNG", "SONY"],
@@ -96,22 +105,28 @@ def find_brand(title, link, category):
     "PAS": ["SONY",],
     "ILC": ["SONY", "FUJIFILM", "CANON", "PANASONIC", "NIKON", "OM SYSTEM"],
     "LENS": ["SONY", "FUJIFILM", "CANON", "PANASONIC", "NIKON", "LEICA", "HASSELBLAD", "TAMRON", "LAOWA", "SIGMA", "SAMYANG", "VOIGTLANDER", "ZEISS", "HASSELBLAD", "OLYMPUS", "VILTROX"]
-    }
+}
 
-    brand_list = category_brand_map[category]
-   
-    brand = None
+## compiled once, one matcher per category
+BRAND_MATCHERS = {category: BrandMatcher(brands) for category, brands in CATEGORY_BRAND_MAP.items()}
 
-    for b in brand_list:
-        if b.lower() == "AUDIO TECHNICA":
-            if "audio-technica" in title.lower() or "audio-technica" in link.lower():
-                brand = b
-                break
-        elif b.lower() in title.lower() or b.lower() in link.lower():
-            brand = b
-            break
+## finished listing pages and products of today's crawl, for resuming after a crash
+## this crawler's name in the dataset and the journal
+CRAWLER = "id_toko"
+
+JOURNAL = toko_journal.Journal(CRAWLER)
 
-    return brand
+## images, media, fonts and trackers are dropped before they load (see toko_common.ResourcePolicy)
+RESOURCE_POLICY = ResourcePolicy()
+
+## [url, blocked requests, bytes loaded] per page read
+resource_log = []
+
+class CrawlError(Exception):
+    """A page stayed unreachable after the retries; the category is left for a rerun to resume."""
+
+def find_brand(title, link, category):
+    return BRAND_MATCHERS[category].match(title, link)
 
 def start_driver():
     options = webdriver.ChromeOptions()
@@ -140,28 +155,39 @@ def start_driver():
     options.add_argument("--window-position=-2400,-2400")
 
     options.headless = True
+    if RESOURCE_POLICY.enabled:
+        ## network events, to count what was blocked and loaded per page
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
     driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
     driver.set_page_load_timeout(5)
     driver.execute_script(
         "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
     )
 
+    ## the browser drops these URLs in its network layer, so the requests are never sent
+    blocked_urls = RESOURCE_POLICY.url_patterns()
+    if blocked_urls:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_urls})
+
     return driver
 
-DATA_COLUMNS = [
-        "Date",
-        "Dealer Site",
-        "Category",
-        "Material Description",
-        "Brand",
-        "Link",
-        "Final Price",
-        "Original Price",
-        "Stock",
-        "Average Rating",
-        "Total Review",
-        "Model Position",
-    ]
+def log_resources(driver, url):
+    """Drains the driver's network log into resource_log as one entry for `url`."""
+    if not RESOURCE_POLICY.enabled:
+        return
+    blocked, loaded, events = 0, 0, 0
+    for entry in driver.get_log("performance"):
+        message = json.loads(entry["message"])["message"]
+        if message["method"] == "Network.loadingFailed":
+            events += 1
+            if message["params"].get("blockedReason"):
+                blocked += 1
+        elif message["method"] == "Network.loadingFinished":
+            events += 1
+            loaded += message["params"].get("encodedDataLength", 0)
+    if events:
+        resource_log.append([url, blocked, int(loaded)])
 
 def add_to_df(productDf, newEntry):
     return pd.concat([productDf, newEntry], ignore_index=True)
@@ -169,7 +195,8 @@ def add_to_df(productDf, newEntry):
 ## ===== PHASE 1: Scrape Category Page =====
 def scrape_cat_page(links_list):
 
-    driver = start_driver()
+    ## only started once a page isn't in the cache
+    driver = None
 
     ## result dictionary: link -> html chunk
     result_dict = {}
@@ -182,16 +209,38 @@ def scrape_cat_page(links_list):
 
         while True:
             page_counter += 1
-            while True:
-                try:
-                    driver.get(link + str(page_counter) + DEALER_PRODUCT_LIMIT)
-                except TimeoutException:
-                    continue
+            page_url = link + str(page_counter) + DEALER_PRODUCT_LIMIT
+
+            ## finished before a restart: the journal has the page's product cards
+            journaled = JOURNAL.listing(page_url)
+            if journaled is not None:
+                cards, last = journaled
+                if last:
+                    break
+                new_html_list += make_soup("".join(cards), LISTING_NODES).find_all("div", class_="css-1sn1xa2")
+                print(f"  >> Page {page_counter} scraped! (journal)")
+                continue
+
+            try:
+                html = toko_cache.get_listing(page_url)
+            except toko_cache.CacheMiss as e:
+                print(f"  {e}")
                 break
-            timewait("medium")
+            from_cache = html is not None
+
+            if not from_cache:
+                if driver is None:
+                    driver = start_driver()
+                while True:
+                    try:
+                        driver.get(rebase_url(page_url))
+                    except TimeoutException:
+                        continue
+                    break
+                timewait("medium")
+                html = driver.page_source
 
             errorCounter = 0
-            html = driver.page_source
 
             while (
                 "This site can't be reached" in html
@@ -206,8 +255,8 @@ def scrape_cat_page(links_list):
                     print(f"Could not access Page {page_counter}")
                     print("Please restart the script & retry!")
                     print("+--------------------------------+")
-                    sys.exit()
-                    break
+                    driver.quit()
+                    raise CrawlError(f"Could not access {page_url}")
 
                 print(
                     f"  ERROR: Could not access Page {page_counter} -- Attempt {errorCounter + 1}, retrying..."
@@ -218,7 +267,7 @@ def scrape_cat_page(links_list):
                 driver = start_driver()
                 while True:
                     try:
-                        driver.get(link + str(page_counter) + DEALER_PRODUCT_LIMIT)
+                        driver.get(rebase_url(page_url))
                     except TimeoutException:
                         continue
                     break
@@ -227,7 +276,11 @@ def scrape_cat_page(links_list):
 
                 errorCounter += 1
 
-            soup = BeautifulSoup(html, "html.parser")
+            if not from_cache:
+                log_resources(driver, page_url)
+                toko_cache.put_listing(page_url, html)
+
+            soup = make_soup(html, LISTING_NODES)
             error_message, error_message2 = soup.find(
                 "div", class_="css-3ytcpr-unf-emptystate e1mmy8p70"
             ), soup.find(
@@ -236,6 +289,7 @@ def scrape_cat_page(links_list):
 
             if error_message or error_message2:
                 # print("  ERROR FOUND: " + error_message.text)
+                JOURNAL.record_listing(page_url, [], last=True)
                 print("  Exiting page / category...\n")
                 print()
                 break
@@ -249,25 +303,28 @@ def scrape_cat_page(links_list):
 
 
             parsed_products = soup.find_all("div", class_="css-1sn1xa2")
+            JOURNAL.record_listing(page_url, [str(div) for div in parsed_products])
 
             new_html_list += parsed_products
-            print(f"  >> Page {page_counter} scraped!")
+            print(f"  >> Page {page_counter} scraped!" + (" (cached)" if from_cache else ""))
 
-            timewait("low")
+            if not from_cache:
+                timewait("low")
 
         if link not in result_dict:
             result_dict[link] = new_html_list
             ## result_dict[link][html] = new_html_list
             ## result_dict[link][promo] = promo_dict
 
-    driver.quit()
+    if driver is not None:
+        driver.quit()
     return result_dict
 
 ## ===== PHASE 2: Parse Material from HTML =====
 def parse_cat_page(scraped_cat_page_result, dealer, category, export=False):
 
-    parsed_columns = ["Category", "Material Description", "Dealer Site", "Link", "Model Position"]
-    parsedDf = pd.DataFrame(columns=parsed_columns)
+    parsed_columns = ["Category", "Material Description", "Dealer Site", "Link", "Model Position", "Listing Price"]
+    parsed_records = RecordAccumulator(parsed_columns)
 
     ## dictionary for counting items in each link
     count_dict = {}
@@ -294,10 +351,13 @@ def parse_cat_page(scraped_cat_page_result, dealer, category, export=False):
                 "href"
             ]
 
-            newEntry = pd.DataFrame(
-                [[category, title, dealer, link_elm, model_position]], columns=parsed_columns
-            )
-            parsedDf = pd.concat([parsedDf, newEntry], ignore_index=True)
+            ## displayed price, used to tell whether the product changed since the last run
+            price_elm = pdt.find("div", class_="prd_link-product-price")
+            listing_price = price_elm.text.strip() if price_elm else None
+
+            parsed_records.append([category, title, dealer, link_elm, model_position, listing_price])
+
+    parsedDf = parsed_records.to_df()
 
     if export == True:
         if not os.path.exists(EXPORT_DATE):
@@ -309,14 +369,12 @@ def parse_cat_page(scraped_cat_page_result, dealer, category, export=False):
 
 ## ===== PHASE 3: Scrape Individual Product Pages =====
 
-def scrape_page(soup, category, dealer, link, modelPosition, productDf):
+def scrape_page(pdp, category, dealer, link, modelPosition, records):
+    ## pdp: the product page fields from read_pdp()
 
-    productDf = productDf
     ## MATERIAL DESCRIPTION - title
-    title_elm = soup.find("div", class_="css-1nylpq2")
-    if title_elm:
-        title = title_elm.text.strip()
-    else: 
+    title = pdp["title"]
+    if title is None:
         print(f"ERROR: Could not find title for {link}")
 
     ## edit the link
@@ -326,75 +384,58 @@ def scrape_page(soup, category, dealer, link, modelPosition, productDf):
     ## BRAND
     brand = find_brand(title, link, category)
 
-    price_elm = soup.find("div", class_="css-chstwd")
-    original_price_elm = price_elm.find("div", class_="original-price")
-
     ## if only got original price => got two prices
-    if original_price_elm:
-        original_price = convert_numbers(original_price_elm.text.strip())
-        final_price = convert_numbers(
-            price_elm.find("div", class_="price").text.strip()
-        )
+    if pdp["original_price"] is not None:
+        original_price = convert_numbers(pdp["original_price"])
+        final_price = convert_numbers(pdp["price"])
 
     ## if got final price
     else:
-        final_price = convert_numbers(
-            price_elm.find("div", class_="price").text.strip()
-        )
+        final_price = convert_numbers(pdp["price"])
         original_price = final_price
 
     ## STOCK
-    oos_elm = soup.find("span", string="Stok Habis")
-    if oos_elm:
+    if pdp["out_of_stock"]:
         stock = 0
     else:
         stock = 1
 
     ## REVIEW
-    average_review_elm = soup.find(
-        attrs={"data-testid": "lblPDPDetailProductRatingNumber"}
-    )
-    total_review_elm = soup.find(
-        attrs={"data-testid": "lblPDPDetailProductRatingCounter"}
-    )
-
-    if average_review_elm or total_review_elm:
-        average_review = convert_numbers(average_review_elm.text.strip())
-        total_review = int(re.sub(r"\D", "", total_review_elm.text.strip()))
+    if pdp["average_review"] is not None or pdp["total_review"] is not None:
+        average_review = convert_numbers(pdp["average_review"])
+        total_review = int(re.sub(r"\D", "", pdp["total_review"]))
     else:
         average_review = None
         total_review = 0
 
-    newEntry = pd.DataFrame(
-                        [
-                            [
-                                CURRENT_DATE,
-                                dealer,
-                                category,
-                                title,
-                                brand,
-                                link,
-                                final_price,
-                                original_price,
-                                stock,
-                                average_review,
-                                total_review,
-                                modelPosition,
-                            ]
-                        ],
-                        columns=DATA_COLUMNS,
-                    )
-    productDf = add_to_df(productDf, newEntry)
-    # productDf = pd.concat([productDf, newEntry], ignore_index=True)
-
-    return productDf
+    records.append(
+        [
+            CURRENT_DATE,
+            dealer,
+            category,
+            title,
+            brand,
+            link,
+            final_price,
+            original_price,
+            stock,
+            average_review,
+            total_review,
+            modelPosition,
+        ]
+    )
+
+    return records
 
 
 def scrape_product_page(result1b, export=True):
 
-    fullDf = pd.DataFrame(columns=DATA_COLUMNS)
+    records = RecordAccumulator(DATA_COLUMNS)
     product_count = 0
-    driver = start_driver()
+    reused_count = 0
+
+    ## only started once a product isn't in the cache
+    driver = None
 
     total_product = result1b.shape[0]
     for index, row in result1b.iterrows():
@@ -405,9 +446,64 @@ def scrape_product_page(result1b, export=True):
         title = row["Material Description"]
         dealer = row["Dealer Site"]
 
+        ## finished before a restart: take its rows from the journal
+        product_key = f"{dealer}|{category}|{link}|{modelPosition}"
+        journaled = JOURNAL.product(product_key)
+        if journaled is not None:
+            for record in journaled:
+                record[0] = CURRENT_DATE
+                records.append(record)
+                product_count += 1
+
+            loading_bar(index + 1, total_product)
+            continue
+        product_start = len(records)
+
+        ## unchanged listing card => reuse the last visit's PDP fields
+        signature = toko_delta.listing_signature(title, link, row.get("Listing Price"))
+        reused_pages = toko_delta.reuse(link, signature)
+        if reused_pages is not None:
+            for page_link, pdp in reused_pages:
+                records = scrape_page(pdp, category, dealer, page_link, modelPosition, records)
+                product_count += 1
+            reused_count += 1
+            JOURNAL.record_product(product_key, records.rows(product_start))
+
+            loading_bar(index + 1, total_product)
+            continue
+
+        try:
+            cached_pages = toko_cache.get_product(link)
+        except toko_cache.CacheMiss as e:
+            print(f"\n  {e}")
+            loading_bar(index + 1, total_product)
+            continue
+
+        if cached_pages is not None:
+            product_pdps = []
+            for variant, page_link, html in cached_pages:
+                pdp = read_pdp(html)
+                records = scrape_page(pdp, category, dealer, page_link, modelPosition, records)
+                product_pdps.append([page_link, pdp])
+                product_count += 1
+            toko_delta.remember(link, signature, product_pdps)
+            JOURNAL.record_product(product_key, records.rows(product_start))
+
+            loading_bar(index + 1, total_product)
+            continue
+
+        ## [variant, url, page source] of every page read, for the cache
+        product_link = link
+        product_pages = []
+        ## [url, pdp fields] of every page read, for the next delta run
+        product_pdps = []
+
+        if driver is None:
+            driver = start_driver()
+
         while True:
             try:
-                driver.get(link)
+                driver.get(rebase_url(link))
             except TimeoutException:
                 continue
             break
@@ -418,15 +514,14 @@ def scrape_product_page(result1b, export=True):
 
         errorCounter = 0
         html = driver.page_source
-        soup = BeautifulSoup(html, "html.parser")
-        title_elm = soup.find("div", class_="css-1nylpq2")
+        pdp = read_pdp(html)
 
         while (
             "This site can't be reached" in html
             or "might be temporarily down or it may have moved permanently to a new web address"
             in html
             or not html
-            or not title_elm
+            or pdp["title"] is None
         ):
             if errorCounter >= 3:
                 print()
@@ -435,25 +530,24 @@ def scrape_product_page(result1b, export=True):
                 print(f"Could not access Page for {title}")
                 print("Please restart the script & retry!")
                 print("+--------------------------------+")
-                sys.exit()
-                break
+                driver.quit()
+                ## products done so far are in the journal, the rerun continues from here
+                toko_delta.save_store()
+                raise CrawlError(f"Could not access {link}")
 
             driver.quit()
             timewait("low")
             driver = start_driver()
             while True:
                 try:
-                    driver.get(link)
+                    driver.get(rebase_url(link))
                 except TimeoutException:
                     continue
                 break
             html = driver.page_source
-            soup = BeautifulSoup(html, "html.parser")
-            title_elm = soup.find("div", class_="css-1nylpq2")
+            pdp = read_pdp(html)
             errorCounter += 1
 
-        soup = BeautifulSoup(html, "html.parser")
-
         buttons = None
         buttons2 = None
 
@@ -470,124 +564,163 @@ def scrape_product_page(result1b, export=True):
         if buttons:
             ## iterate through variants
             for button in buttons:
+                variant = button.text.strip()
                 button.click()
                 time.sleep(random.randint(0,1))
 
                 if buttons2:
                     for button2 in buttons2:
+                        variant2 = f"{variant} | {button2.text.strip()}"
                         button2.click()
                         time.sleep(random.randint(0,1))
                         link = driver.current_url
-                        soup = BeautifulSoup(driver.page_source, "html.parser")
-                        fullDf = scrape_page(soup, category, dealer, link, modelPosition, fullDf)
+                        html = driver.page_source
+                        pdp = read_pdp(html)
+                        records = scrape_page(pdp, category, dealer, link, modelPosition, records)
+                        product_pages.append([variant2, link, html])
+                        product_pdps.append([link, pdp])
                         product_count += 1
 
                 else:
                     link = driver.current_url
-                    soup = BeautifulSoup(driver.page_source, "html.parser")
-                    fullDf = scrape_page(soup, category, dealer, link, modelPosition, fullDf)
+                    html = driver.page_source
+                    pdp = read_pdp(html)
+                    records = scrape_page(pdp, category, dealer, link, modelPosition, records)
+                    product_pages.append([variant, link, html])
+                    product_pdps.append([link, pdp])
                     product_count += 1
 
         else:
             time.sleep(random.randint(0,1))
             link = driver.current_url
-            fullDf = scrape_page(soup, category, dealer, link, modelPosition, fullDf)
+            records = scrape_page(pdp, category, dealer, link, modelPosition, records)
+            product_pages.append([None, link, html])
+            product_pdps.append([link, pdp])
             product_count += 1
 
+        if driver is not None:
+            log_resources(driver, product_link)
+        toko_cache.put_product(product_link, product_pages)
+        toko_delta.remember(product_link, signature, product_pdps)
+        JOURNAL.record_product(product_key, records.rows(product_start))
+
         loading_bar(index + 1, total_product)
 
-    driver.quit()
+    if driver is not None:
+        driver.quit()
+    toko_delta.save_store()
+    fullDf = records.to_df()
+
     if export == True:
-        if not os.path.exists(EXPORT_DATE):
-            os.makedirs(EXPORT_DATE)
-        FILENAME = f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_{dealer.lower()}_{category.lower()}.xlsx"
-        fullDf.to_excel(FILENAME, index=False)
+        toko_dataset.write_partition(fullDf, EXPORT_DATE, dealer, category, CRAWLER)
 
     print()
     print("Total Products: " + str(product_count))
+    if toko_delta.DELTA_MODE:
+        print(f"PDP visits skipped (listing unchanged): {reused_count}/{total_product}")
     return fullDf
 
 
 def crawl_toko(dealer_dictionary = dealer_dictionary):
+    """Crawls every dealer/category not yet in today's dataset; returns the [dealer, category] pairs that failed."""
 
+    failed = []
     for dealer, catergories in dealer_dictionary.items():
         for category, links_list in catergories.items():
             
-            if os.path.exists(f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_{dealer.lower()}_{category.lower()}.xlsx"):
+            if toko_dataset.partition_exists(EXPORT_DATE, dealer, category, CRAWLER):
                 continue
             else:
-                ## scraping of cat page
-                print(f"SCRAPPING {dealer.upper()} - {category.upper()}...")
-                scrape_cat_page_result = scrape_cat_page(links_list)
-                parse_cat_page_result = parse_cat_page(scrape_cat_page_result, dealer, category, export=ALL_EXPORT)
-
-                ## scraping of product page
-                print(f"ITERATING INDIV PRODUCT PAGE FOR {dealer.upper()} - {category.upper()}...")
-                scrape_product_page_result = scrape_product_page(parse_cat_page_result, export=True)
+                try:
+                    ## scraping of cat page
+                    print(f"SCRAPPING {dealer.upper()} - {category.upper()}...")
+                    scrape_cat_page_result = scrape_cat_page(links_list)
+                    parse_cat_page_result = parse_cat_page(scrape_cat_page_result, dealer, category, export=ALL_EXPORT)
+
+                    ## scraping of product page
+                    print(f"ITERATING INDIV PRODUCT PAGE FOR {dealer.upper()} - {category.upper()}...")
+                    scrape_product_page_result = scrape_product_page(parse_cat_page_result, export=True)
+                except CrawlError as e:
+                    ## finished pages and products are journaled, rerunning the script resumes this category
+                    print(f"  {e}, moving on to the next category")
+                    failed.append([dealer, category])
+                    continue
 
-    return  
+    JOURNAL.close()
+    print_resource_report(resource_log)
+    return failed
 
 
 ## ===== (NEW) PHASE 3: Scrape Individual Product Pages with Playwright =====
 
 
 
-def merge_all_files():
+def merge_all_files(export_xlsx=FULL_XLSX_EXPORT):
 
-    fullDf = pd.DataFrame(columns=DATA_COLUMNS)
+    ## today's partitions of the dataset, every dealer/category at once
+    fullDf = toko_dataset.read(date=EXPORT_DATE, crawler=CRAWLER)
+    if fullDf is None:
+        fullDf = pd.DataFrame(columns=DATA_COLUMNS)
 
-    for dealer, catergories in dealer_dictionary.items():
-        for category, links_list in catergories.items():
-            if os.path.exists(f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_{dealer.lower()}_{category.lower()}.xlsx"):
-                df = pd.read_excel(f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_{dealer.lower()}_{category.lower()}.xlsx")
-                fullDf = pd.concat([fullDf, df], ignore_index=True)
-
-    FILENAME = f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_FULL.xlsx"
-    fullDf.to_excel(FILENAME, index=False)
+    if export_xlsx:
+        if not os.path.exists(EXPORT_DATE):
+            os.makedirs(EXPORT_DATE)
+        FILENAME = f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_FULL.xlsx"
+        fullDf.to_excel(FILENAME, index=False)
 
     return fullDf
 
 def validate_masterlist():
-    try:
-        masterlist = pd.read_excel("toko_masterlist.xlsx")
-        today = pd.read_excel(f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_FULL.xlsx")
-    except FileNotFoundError:
-        print("Masterlist or today's file not found!")
+    today = toko_dataset.read(date=EXPORT_DATE, crawler=CRAWLER)
+    if today is None or today.empty:
+        print("Today's crawl not found!")
         return
-    
-    def is_partial_match(link, masterlist_links):
-        return any(masterlink in link or link in masterlink for masterlink in masterlist_links)
 
-    today['Dealer and Material'] = today['Dealer Site'] + " - " + today['Material Description']
-    masterlist['Dealer and Material'] = masterlist['Dealer Site'] + " - " + masterlist['Material Description']
-     
-    new_df = today[~today['Dealer and Material'].apply(lambda link: is_partial_match(link, masterlist['Dealer and Material'].values))]
-    missing_df = masterlist[~masterlist['Dealer and Material'].apply(lambda link: is_partial_match(link, today['Dealer and Material'].values))]
+    ## the masterlist lives in sqlite, a row per dealer/material/link matched on "Dealer - Material" (migrated from toko_masterlist.xlsx on first use)
+    conn = toko_masterlist.connect()
+    today_date = toko_masterlist.plain_value(today['Date'].iloc[0])
+
+    today['Dealer and Material'] = [toko_masterlist.masterlist_key(dealer, material)
+                                    for dealer, material in zip(today['Dealer Site'], today['Material Description'])]
+
+    ## exact keys are indexed lookups, only the rest need the partial match against the stored keys
+    known = toko_masterlist.known_keys(conn, today['Dealer and Material'])
+    unknown = today[~today['Dealer and Material'].isin(known)]
+    if len(unknown):
+        masterlist_matcher = PartialMatcher(toko_masterlist.all_keys(conn))
+        new_df = unknown[~unknown['Dealer and Material'].map(masterlist_matcher.matches).astype(bool)]
+    else:
+        new_df = unknown
+
+    ## update masterlist: Last Seen for known products, new rows for the rest
+    toko_masterlist.upsert(conn, today.drop(columns=['Dealer and Material']), last_seen_column='Date')
+
+    ## MISSING: products not seen today, unless a partial match turned up
+    today_matcher = PartialMatcher(today['Dealer and Material'].values)
+    missing_rows = [row for key, row in toko_masterlist.rows_not_seen_on(conn, today_date) if key is None or not today_matcher.matches(key)]
+    missing_df = pd.DataFrame(missing_rows)
+    conn.close()
 
     new_df = new_df.drop(columns=['Dealer and Material'])
-    missing_df = missing_df.drop(columns=['Dealer and Material'])
     new_df.to_excel(f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_NEW.xlsx", index=False)
     missing_df.to_excel(f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_MISSING.xlsx", index=False)
 
-    ## update masterlist with new data and updated last seen
-    masterlist_updated = masterlist.copy()
-    matching_links = masterlist['Dealer and Material'].isin(today['Dealer and Material'])
-    masterlist_updated.loc[matching_links, 'Last Seen'] = today['Date'].iloc[0]  
-
-    new_rows_in_today = today[~today['Dealer and Material'].isin(masterlist['Dealer and Material'])]
-    new_rows_in_today = new_rows_in_today.rename(columns={'Date': 'Last Seen'})
-    updated_masterlist = pd.concat([masterlist_updated, new_rows_in_today], ignore_index=True)
-    updated_masterlist = updated_masterlist.drop(columns=['Dealer and Material'])
-    updated_masterlist.to_excel("toko_masterlist.xlsx", index=False)
-
     return
 
-crawl_toko()
-# with ThreadPoolExecutor(max_workers=4) as executor:
-#     executor.map(crawl_toko)
+if __name__ == "__main__":
+    failed_categories = crawl_toko()
+    # with ThreadPoolExecutor(max_workers=4) as executor:
+    #     executor.map(crawl_toko)
+
+    ## the FULL export and the masterlist only run on a complete day, a rerun resumes the failed categories first
+    if failed_categories:
+        print("Incomplete crawl, FULL export and masterlist validation skipped. Failed categories:")
+        for dealer, category in failed_categories:
+            print(f"  {dealer} - {category}")
+        sys.exit(1)
 
-merge_all_files()
-validate_masterlist()
+    merge_all_files()
+    validate_masterlist()
 
 
 
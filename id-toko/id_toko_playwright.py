@@ -1,3 +1,6 @@
+import csv
+import itertools
+import math
 import pandas as pd
 import re
 import time
@@ -8,7 +11,15 @@ import os
 from datetime import datetime
 
 import asyncio
-from playwright.async_api import async_playwright
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+import toko_cache
+import toko_dataset
+import toko_delta
+import toko_journal
+from toko_common import BrandMatcher, ResourcePolicy, make_soup, print_resource_report, read_pdp, rebase_url
 
 EXPORT_DATE = datetime.now().strftime("%Y%m%d")
 
@@ -25,12 +36,11 @@ def convert_numbers(str_number):
     # Return the number as a float or int depending on the input
     return float(cleaned_str) if cleaned_str else 0
 
-def find_brand(title, link):
-    brand = None
+## brands whose name isn't simply the first word of the title
+BRAND_MATCHER = BrandMatcher(["AUDIO TECHNICA"])
 
-    if "audio-technica" in title.lower() or "audio-technica" in link.lower() or\
-        "audio technica" in title.lower() or "audio technica" in link.lower():
-        brand = "AUDIO TECHNICA"
+def find_brand(title, link):
+    brand = BRAND_MATCHER.match(title, link)
 
     if brand is None:
         brand = title.split(" ")[0].upper()
@@ -108,6 +118,31 @@ dealer_dictionary = get_dealer_links(DEALER_LINKS_FILENAME)
 
 MAX_CONCURRENT_TASKS = 5  # Control concurrency
 
+# Pagination fan-out: the page count is read off a link's first page and the other pages load as
+# tasks of their own; "off" walks the pages one after another until the empty state
+PAGINATION_FANOUT = os.environ.get("TOKO_PAGINATION_FANOUT", "on") == "on"
+
+# Page number buttons of the pagination control (only the ones whose text is a number count)
+PAGINATION_SELECTOR = 'nav[aria-label="Navigasi halaman"] button, [class*="pagination"] a, [class*="pagination"] button, [data-testid^="btnShopProductPage"]'
+# "Menampilkan 1 - 80 produk dari total 1.234", the result count above the cards
+RESULT_COUNT_RE = re.compile(r"Menampilkan\s+[\d.]+\s*-\s*[\d.]+.*?dari\s+(?:total\s+)?([\d.]+)", re.IGNORECASE | re.DOTALL)
+
+# Warm pages are reused across listing pages and PDPs, and replaced after this many uses
+PAGE_RECYCLE_AFTER = int(os.environ.get("TOKO_PAGE_RECYCLE_AFTER", 50))
+# The shared browser context (cache, connections, cookies) is replaced after this many page uses
+CONTEXT_RECYCLE_AFTER = int(os.environ.get("TOKO_CONTEXT_RECYCLE_AFTER", 500))
+
+# Listing-only mode: build rows from the listing cards and only open PDPs of products known to have variants
+LISTING_ONLY_MODE = os.environ.get("TOKO_LISTING_ONLY", "off") == "on"
+
+# This crawler's name in the dataset and the journal
+CRAWLER = "id_toko_playwright"
+
+# Finished listing pages and products of today's crawl, for resuming after a crash
+# (each listing-only pulse gets its own, its whole point is fresh listing pages)
+JOURNAL_NAME = CRAWLER + (datetime.now().strftime("_listing_%H%M") if LISTING_ONLY_MODE else "")
+JOURNAL = toko_journal.Journal(JOURNAL_NAME, EXPORT_DATE)
+
 async def scroll_page(page):
     """Scroll down the page to load dynamically loaded content."""
     previous_height = await page.evaluate("document.body.scrollHeight")
@@ -122,14 +157,264 @@ async def scroll_page(page):
             break  # Stop when no new content is loaded
         previous_height = current_height
 
+# ### ===== PAGE READINESS =====
+
+# A page is ready once its data nodes (or the empty state) are on it
+EMPTY_STATE_SELECTOR = "div.css-3ytcpr-unf-emptystate.e1mmy8p70, div.css-e7ogvg-unf-emptystate.e1mmy8p70"
+LISTING_READY_SELECTOR = f"div.css-1sn1xa2, {EMPTY_STATE_SELECTOR}"
+PDP_READY_SELECTOR = f"div.css-1nylpq2, div.css-chstwd, {EMPTY_STATE_SELECTOR}"
+
+# How long to wait for them before reloading, in ms
+READY_TIMEOUT = int(os.environ.get("TOKO_READY_TIMEOUT", "15000"))
+
+# [kind, url, seconds to ready, reloaded, ready] per navigation
+ready_log = []
+
+async def load_page(page, url, ready_selector, kind):
+    """Navigates once and waits for the data nodes; reloads only when they don't show up. Returns whether the page got ready."""
+    start = time.perf_counter()
+    await page.goto(rebase_url(url), timeout=50000, wait_until="domcontentloaded")
+
+    reloaded = False
+    try:
+        await page.wait_for_selector(ready_selector, timeout=READY_TIMEOUT)
+        ready = True
+    except PlaywrightTimeoutError:
+        reloaded = True
+        await page.reload(timeout=50000, wait_until="domcontentloaded")
+        try:
+            await page.wait_for_selector(ready_selector, timeout=READY_TIMEOUT)
+            ready = True
+        except PlaywrightTimeoutError:
+            ready = False
+
+    ready_log.append([kind, url, time.perf_counter() - start, reloaded, ready])
+    return ready
+
+def print_ready_report(ready_log):
+    """Time-to-ready per page kind: median / p95 / max, and how many pages needed a reload."""
+    for kind in sorted(set(x[0] for x in ready_log)):
+        entries = [x for x in ready_log if x[0] == kind]
+        seconds = sorted(x[2] for x in entries)
+        p95 = seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))]
+        print(f"{kind} pages: {len(entries)}, ready in {seconds[len(seconds) // 2]:.1f}s median / {p95:.1f}s p95 / {seconds[-1]:.1f}s max, "
+              f"reloaded: {sum(1 for x in entries if x[3])}, never ready: {sum(1 for x in entries if not x[4])}")
+
+# ### ===== IN-PAGE EXTRACTION =====
+
+# Each page's fields come back from one evaluate call (a single round trip) as raw innerText;
+# stripping and the rest of the clean-up stay in Python, as with the element handles before.
+
+LISTING_EXTRACT_JS = """() => {
+    const text = (root, selector) => {
+        const elm = root.querySelector(selector);
+        return elm ? elm.innerText : null;
+    };
+    const empty = document.querySelector('div.css-3ytcpr-unf-emptystate.e1mmy8p70, div.css-e7ogvg-unf-emptystate.e1mmy8p70') !== null;
+    const container = document.querySelector('div.css-azhcs7.e18kalgp2');
+    const promotions = container ? Array.from(container.querySelectorAll('div.css-1o4foo6'), elm => elm.innerText) : [];
+    const cards = Array.from(document.querySelectorAll('div.css-1sn1xa2'), div => {
+        const anchor = div.querySelector('a.pcv3__info-content.css-gwkf0u');
+        return {
+            title: text(div, 'div.prd_link-product-name.css-3um8ox'),
+            link: anchor ? anchor.getAttribute('href') : null,
+            has_link: anchor !== null,
+            price: text(div, 'div.prd_link-product-price'),
+            original_price: text(div, 'span.css-1xpa9ly'),
+            rating: text(div, '[class*="prd_rating-average-text"]'),
+            out_of_stock: div.innerText.toLowerCase().includes('stok habis'),
+        };
+    });
+    return {empty, promotions, cards};
+}"""
+
+PDP_EXTRACT_JS = """() => {
+    const text = (root, selector) => {
+        const elm = root ? root.querySelector(selector) : null;
+        return elm ? elm.innerText : null;
+    };
+    const priceElm = document.querySelector('div.css-chstwd');
+    // same test as the span:text("Stok Habis") selector: case-insensitive, whitespace-collapsed substring
+    const outOfStock = Array.from(document.querySelectorAll('span')).some(
+        span => span.textContent.replace(/\\s+/g, ' ').toLowerCase().includes('stok habis'));
+    return {
+        title: text(document, 'div.css-1nylpq2'),
+        original_price: text(priceElm, 'div.original-price'),
+        price: text(priceElm, 'div.price'),
+        out_of_stock: outOfStock,
+        average_review: text(document, '[data-testid="lblPDPDetailProductRatingNumber"]'),
+        total_review: text(document, '[data-testid="lblPDPDetailProductRatingCounter"]'),
+    };
+}"""
+
+def strip_text(value):
+    return value.strip() if value is not None else None
+
+# ### ===== RESOURCE BLOCKING =====
+
+# Images, media, fonts and trackers are dropped before they load (see toko_common.ResourcePolicy)
+RESOURCE_POLICY = ResourcePolicy()
+
+# [url, blocked requests, bytes loaded (encoded body and headers)] per page visit
+resource_log = []
+
+async def count_response(request, stats):
+    # Encoded body and headers as received: content-length is missing on chunked and most compressed responses
+    try:
+        sizes = await request.sizes()
+    except Exception:
+        return  # the page closed before the sizes could be read
+    stats[1] += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+
+def count_blocked(event, stats):
+    if event.get("blockedReason"):
+        stats[0] += 1
+
+async def apply_resource_policy(page):
+    """Blocks the policy's urls in the page's network layer; returns its [blocked, loaded bytes] counters.
+
+    Blocking goes through CDP's Network.setBlockedURLs like the Selenium crawler, not page.route():
+    a routed page gets no http cache, and the pool's shared contexts are there to keep it warm.
+    """
+    stats = [0, 0]
+    blocked_urls = RESOURCE_POLICY.url_patterns()
+    if blocked_urls:
+        session = await page.context.new_cdp_session(page)
+        session.on("Network.loadingFailed", lambda event: count_blocked(event, stats))
+        await session.send("Network.enable")
+        await session.send("Network.setBlockedURLs", {"urls": blocked_urls})
+        page.on("requestfinished", lambda request: count_response(request, stats))
+    return stats
+
+# ### ===== PAGE POOL =====
+
+class PagePool:
+    """Warm pages in a shared browser context that workers check out and hand back.
+
+    browser.new_page() opens a fresh context every time, so each page started with a cold
+    renderer and empty caches. Pooled pages keep the context's cached JS/CSS and open
+    connections across pages. A page is replaced after PAGE_RECYCLE_AFTER uses or when a
+    use fails, and the context after CONTEXT_RECYCLE_AFTER uses (its pages retire as they
+    come back, it closes with the last one).
+
+    The idle queue holds `size` entries, pages or None for a slot whose page is not open yet
+    (or could not be opened): a failed page opening puts its slot back and raises, so the next
+    acquire tries again instead of waiting on a slot that is gone.
+    """
+
+    def __init__(self, browser, size, page_uses=None, context_uses=None):
+        self.browser = browser
+        self.size = size
+        self.page_uses = page_uses or PAGE_RECYCLE_AFTER
+        self.context_uses = context_uses or CONTEXT_RECYCLE_AFTER
+        self.idle = asyncio.Queue()
+        for _ in range(size):
+            self.idle.put_nowait(None)
+        self.context = None
+        self.context_served = 0
+        self.live_pages = {}   # context -> pages of it still open
+        self.uses = {}         # page -> completed uses
+        self.stats = {}        # page -> [blocked requests, bytes loaded] of the current use
+        self.lock = asyncio.Lock()
+
+    async def new_page(self):
+        if self.context is None or self.context_served >= self.context_uses:
+            old_context = self.context
+            self.context = await self.browser.new_context()
+            self.context_served = 0
+            self.live_pages[self.context] = 0
+            if old_context is not None and self.live_pages[old_context] == 0:
+                await self.close_context(old_context)
+
+        page = await self.context.new_page()
+        try:
+            stats = await apply_resource_policy(page)
+        except BaseException:
+            await page.close()
+            raise
+        self.live_pages[self.context] += 1
+        self.uses[page] = 0
+        self.stats[page] = stats
+        return page
+
+    async def open_slot(self):
+        """A new page for a free slot; if it can't be opened the slot goes back to the queue and the error is raised."""
+        try:
+            return await self.new_page()
+        except BaseException:
+            self.idle.put_nowait(None)
+            raise
+
+    async def replace(self, page):
+        try:
+            await self.retire(page)
+        except BaseException:
+            self.idle.put_nowait(None)
+            raise
+        return await self.open_slot()
+
+    async def retire(self, page):
+        context = page.context
+        self.uses.pop(page, None)
+        self.stats.pop(page, None)
+        self.live_pages[context] -= 1
+        if not page.is_closed():
+            await page.close()
+        if context is not self.context and self.live_pages[context] == 0:
+            await self.close_context(context)
+
+    async def close_context(self, context):
+        del self.live_pages[context]
+        await context.close()
+
+    async def acquire(self):
+        page = await self.idle.get()
+        async with self.lock:
+            if page is None:
+                return await self.open_slot()
+            ## idle since its context was replaced (or crashed meanwhile): swap it for a fresh one
+            if page.context is not self.context or page.is_closed():
+                return await self.replace(page)
+        return page
+
+    async def release(self, page, broken=False):
+        self.uses[page] += 1
+        stats = self.stats[page]
+        if RESOURCE_POLICY.enabled:
+            resource_log.append([page.url, stats[0], stats[1]])
+        stats[0] = stats[1] = 0
+        if page.context is self.context:
+            self.context_served += 1
+
+        if broken or page.is_closed() or self.uses[page] >= self.page_uses or page.context is not self.context:
+            async with self.lock:
+                page = await self.replace(page)
+        self.idle.put_nowait(page)
+
+    @contextlib.asynccontextmanager
+    async def page(self):
+        """async with pool.page() as page: ... -- a page that failed mid-use is not handed out again."""
+        page = await self.acquire()
+        broken = True
+        try:
+            yield page
+            broken = False
+        finally:
+            await self.release(page, broken)
+
+    async def close(self):
+        for context in list(self.live_pages):
+            await self.close_context(context)
+        self.context = None
+
 # ### ===== PHASE 1: SCRAPING CATEGORIES =====
 
-async def scrape_category(semaphore, browser, links, const, dealer, category):
+async def scrape_category(semaphore, pool, links, const, dealer, category):
     """To call and concurrently run all category pages for a dealer"""
 
     tasks = []
     for link in links:
-        tasks.append(scrape_link_with_pagination(semaphore, browser, link, const, dealer, category))
+        tasks.append(scrape_link_with_pagination(semaphore, pool, link, const, dealer, category))
     
     # Gather results from all links
     results = await asyncio.gather(*tasks)
@@ -139,72 +424,155 @@ async def scrape_category(semaphore, browser, links, const, dealer, category):
     
     return flattened_results
 
-async def scrape_link_with_pagination(semaphore, browser, base_url, const, dealer, category):
-    """To iterate through all pages of a category"""
-    async with semaphore:
-        counter = 1
-        all_product_data = []
-        position = 1
-
+async def read_listing_page(semaphore, pool, url, dealer, category, count_pages=False):
+    """One listing page as [success, product data, page count]; positions are numbered from 1 on every page.
+
+    The page count (only looked for with count_pages) is None when the page shows neither a
+    pagination control nor a result count.
+    """
+    # Finished before a restart: the journal has the page's listing results
+    journaled = JOURNAL.listing(url)
+    if journaled is not None:
+        product_data, last = journaled
+        return not last, product_data, JOURNAL.page_count(url) if count_pages else None
+
+    try:
+        html = toko_cache.get_listing(url)
+    except toko_cache.CacheMiss as e:
+        print(f"  {e}")
+        return False, [], None
+
+    if html is not None:
+        success, product_data, _ = read_category_html(html, 1, dealer, category)
+    else:
+        # A page that never got ready is tried again on a fresh pool page, then the error is raised
+        # (the crawl stops there, a rerun resumes from the journal)
+        errorCounter = 0
         while True:
-            url = f"{base_url}{counter}{const}"
-            page = await browser.new_page()
-            success, product_data, position = await scrape_category_page(page, url, position, dealer, category)
+            try:
+                async with semaphore:
+                    async with pool.page() as page:
+                        success, product_data, _ = await scrape_category_page(page, url, 1, dealer, category)
+                        if count_pages and success:
+                            html = await page.content()
+                break
+            except PlaywrightTimeoutError:
+                errorCounter += 1
+                if errorCounter >= 3:
+                    raise
+
+    page_count = None
+    if count_pages and success:
+        page_count = listing_page_count(html, listing_per_page(url))
+        if page_count is not None:
+            JOURNAL.record_page_count(url, page_count)
+
+    JOURNAL.record_listing(url, product_data, last=not success)
+    return success, product_data, page_count
 
+async def scrape_link_with_pagination(semaphore, pool, base_url, const, dealer, category):
+    """To iterate through all pages of a category"""
+    pages = []
+
+    success, product_data, page_count = await read_listing_page(semaphore, pool, f"{base_url}1{const}", dealer, category,
+                                                                count_pages=PAGINATION_FANOUT)
+    if not success:
+        return []
+    pages.append(product_data)
+    counter = 2
+
+    # Pages 2..N at once, each takes a semaphore slot only while it loads
+    if page_count is not None and page_count > 1:
+        results = await asyncio.gather(*[
+            read_listing_page(semaphore, pool, f"{base_url}{n}{const}", dealer, category) for n in range(2, page_count + 1)
+        ])
+        for success, product_data, _ in results:
             if not success:
-                await page.close()
-                break
+                return resequence(pages)
+            pages.append(product_data)
+        counter = page_count + 1
 
-            all_product_data.extend(product_data)
-            counter += 1
-            await page.close()
+    # Without a page count, or past it (a pagination control may not show the last page), walk on until the empty state
+    while True:
+        success, product_data, _ = await read_listing_page(semaphore, pool, f"{base_url}{counter}{const}", dealer, category)
+        if not success:
+            break
+        pages.append(product_data)
+        counter += 1
+
+    return resequence(pages)
+
+def resequence(pages):
+    """Numbers the pages' rows as one run, as if they were read in order: each page continues the positions of the one before."""
+    all_product_data = []
+    position = 1
+    for product_data in pages:
+        if not product_data:
+            continue
+        # also right for rows journaled with the positions of a serial walk
+        offset = position - product_data[0]['Position']
+        for row in product_data:
+            all_product_data.append(dict(row, **{
+                'Position': row['Position'] + offset,
+                'Position Out Of': row['Position Out Of'] + offset,
+            }))
+        position += len(product_data)
+    return all_product_data
+
+def listing_per_page(url):
+    match = re.search(r"perpage=(\d+)", url)
+    return int(match.group(1)) if match else 80
+
+def listing_page_count(html, per_page):
+    """Pages of a listing, from its pagination control or its result count (whichever says more); None if it has neither."""
+    soup = make_soup(html)
+
+    page_count = None
+    numbers = [int(elm.get_text().strip()) for elm in soup.select(PAGINATION_SELECTOR) if elm.get_text().strip().isdigit()]
+    if numbers:
+        page_count = max(numbers)
+
+    match = RESULT_COUNT_RE.search(soup.get_text(" "))
+    if match:
+        total = int(match.group(1).replace(".", ""))
+        page_count = max(page_count or 0, math.ceil(total / per_page))
+
+    return page_count
 
-        return all_product_data
-    
 async def scrape_category_page(page, url, position_start, dealer, category):
     """Scrapes a category page, retrieves divs, product details, and universal promotions, and tracks position."""
-    await page.goto(url, timeout=50000, wait_until="domcontentloaded")  # Increased timeout and changed wait condition
+    # Never showed cards or the empty state: raised before anything is cached, so it isn't journaled either
+    if not await load_page(page, url, LISTING_READY_SELECTOR, "listing"):
+        raise PlaywrightTimeoutError(f"{url} never showed its product cards")
 
     # Scroll to load all dynamic content
-    await page.reload()
     await scroll_page(page)
 
-    # Check for error state divs
-    empty_state_1 = await page.query_selector('div.css-3ytcpr-unf-emptystate.e1mmy8p70')
-    empty_state_2 = await page.query_selector('div.css-e7ogvg-unf-emptystate.e1mmy8p70')
+    if toko_cache.PAGE_CACHE_MODE == "on":
+        toko_cache.put_listing(url, await page.content())
+
+    # Every card field, the promotions and the empty state in one round trip
+    extracted = await page.evaluate(LISTING_EXTRACT_JS)
 
-    if empty_state_1 or empty_state_2:
+    if extracted["empty"]:
         return False, [], position_start  # Skip this page if empty state is found
 
-    # Collect all divs with the target class for products
-    divs = await page.query_selector_all('div.css-1sn1xa2')
+    cards = extracted["cards"]
 
     # Calculate the total number of products as position_out_of
-    position_out_of = position_start + len(divs) - 1
+    position_out_of = position_start + len(cards) - 1
 
-    # Check for the presence of the promo container (optional)
-    promo_container = await page.query_selector('div.css-azhcs7.e18kalgp2')
-    promotions = []
-    if promo_container:
-        # Get promotions from the container
-        promo_divs = await promo_container.query_selector_all('div.css-1o4foo6')
-        for promo in promo_divs:
-            promo_text = await promo.inner_text()
-            promo_text = promo_text.replace("\n", " ").replace("Pembelian", "").strip()
-            promotions.append(promo_text)
-
-    # Extract title, link, and position from each div
+    # Promotions from the promo container (optional)
+    promotions = [promo_text.replace("\n", " ").replace("Pembelian", "").strip() for promo_text in extracted["promotions"]]
+
+    # Extract title, link, and position from each card
     product_data = []
     position = position_start
-    for div in divs:
-        title_div = await div.query_selector('div.prd_link-product-name.css-3um8ox')
-        link_anchor = await div.query_selector('a.pcv3__info-content.css-gwkf0u')
-
+    for card in cards:
         # Ensure both title and link exist
-        if title_div and link_anchor:
-            title = await title_div.inner_text()
-            link = await link_anchor.get_attribute('href')
-            
+        if card["title"] is not None and card["has_link"]:
+            link = card["link"]
+
             # Trim ?extParam from the link if it exists
             if "?extParam" in link:
                 link = link.split("?extParam")[0]
@@ -215,17 +583,95 @@ async def scrape_category_page(page, url, position_start, dealer, category):
                 'Category': category,
                 'Position': position,
                 'Position Out Of': position_out_of,  # New field added here
-                'Title': title.replace("|", "-"),  # Replaced with Material Description
+                'Title': card["title"].replace("|", "-"),  # Replaced with Material Description
                 'Link': link,
+                'Listing Price': strip_text(card["price"]),  # Displayed price, for the delta crawl
+                'Listing Original Price': strip_text(card["original_price"]),  # Card fields used by the listing-only mode
+                'Listing Rating': strip_text(card["rating"]),
+                'Listing Out Of Stock': card["out_of_stock"],
                 'Promotions': promotions  # Same promotions for all products on the page
             })
-            position += 1  # Increment position for each div
+            position += 1  # Increment position for each card
     
     return True, product_data, position  # Return the updated position
 
+def read_category_html(html, position_start, dealer, category):
+    """Same as scrape_category_page, but reads a cached copy of the page instead of the live one."""
+    soup = make_soup(html)
+
+    if soup.select_one('div.css-3ytcpr-unf-emptystate.e1mmy8p70') or soup.select_one('div.css-e7ogvg-unf-emptystate.e1mmy8p70'):
+        return False, [], position_start
+
+    divs = soup.select('div.css-1sn1xa2')
+    position_out_of = position_start + len(divs) - 1
+
+    promotions = []
+    promo_container = soup.select_one('div.css-azhcs7.e18kalgp2')
+    if promo_container:
+        for promo in promo_container.select('div.css-1o4foo6'):
+            promotions.append(promo.get_text().replace("\n", " ").replace("Pembelian", "").strip())
+
+    product_data = []
+    position = position_start
+    for div in divs:
+        title_div = div.select_one('div.prd_link-product-name.css-3um8ox')
+        link_anchor = div.select_one('a.pcv3__info-content.css-gwkf0u')
+        price_div = div.select_one('div.prd_link-product-price')
+        slash_price_div = div.select_one('span.css-1xpa9ly')
+        rating_span = div.select_one('[class*="prd_rating-average-text"]')
+
+        if title_div and link_anchor:
+            link = link_anchor.get('href')
+            if "?extParam" in link:
+                link = link.split("?extParam")[0]
+
+            product_data.append({
+                'Dealer': dealer,
+                'Category': category,
+                'Position': position,
+                'Position Out Of': position_out_of,
+                'Title': title_div.get_text().replace("|", "-"),
+                'Link': link,
+                'Listing Price': price_div.get_text().strip() if price_div else None,
+                'Listing Original Price': slash_price_div.get_text().strip() if slash_price_div else None,
+                'Listing Rating': rating_span.get_text().strip() if rating_span else None,
+                'Listing Out Of Stock': "stok habis" in div.get_text().lower(),
+                'Promotions': promotions
+            })
+            position += 1
+
+    return True, product_data, position
+
 
 # ### ===== PHASE 2 =====
 
+def listing_details(result):
+    """PDP-shaped fields taken from the listing card alone (no review count on the card)."""
+    return {
+        "title": result['Title'],
+        "original_price": result.get('Listing Original Price'),
+        "price": result.get('Listing Price'),
+        "out_of_stock": result.get('Listing Out Of Stock', False),
+        "average_review": result.get('Listing Rating'),
+        "total_review": None,
+    }
+
+def store_listing_results(dealer_results, data_store):
+    """Listing-only mode: stores a row per card, returns the products that still need a PDP visit for their variants."""
+    needs_pdp = []
+    for result in dealer_results:
+        # Never visited before: its variants are unknown, so it gets a PDP visit too (and is recorded for the next pulse)
+        variants = toko_delta.variant_count(result['Link'])
+        if variants is None or variants > 1 or not result.get('Listing Price'):
+            needs_pdp.append(result)
+            continue
+
+        store_product_details(listing_details(result), result['Link'], result['Dealer'], result['Category'],
+                              result['Position'], result['Position Out Of'], result['Promotions'], data_store)
+
+    print(f"Listing-only rows: {len(dealer_results) - len(needs_pdp)}, PDP visits for variants or unknown products: {len(needs_pdp)}")
+    return needs_pdp
+
 
 # ### ===== FINAL STEPS =====
 
@@ -235,54 +681,47 @@ async def scrape_category_page(page, url, position_start, dealer, category):
 
 
 
-async def scrape_product_details(page, dealer, category, position, position_out_of, promotions, data_store):
-    """Scrapes product details like title, prices, stock, reviews, applies promotions, stores results, and adds created_on."""
+async def read_product_details(page):
+    """Reads the PDP fields off the live page in one evaluate call, in the same shape as toko_common.read_pdp."""
+    pdp = await page.evaluate(PDP_EXTRACT_JS)
+    for field in ["title", "original_price", "price", "average_review", "total_review"]:
+        pdp[field] = strip_text(pdp[field])
+    return pdp
+
+def store_product_details(pdp, link, dealer, category, position, position_out_of, promotions, data_store):
+    """Turns the PDP fields into a result row: prices, promotions, stock, reviews and created_on."""
     
     # Get the current datetime in the format "YYYY-MM-DD HH:MM:SS"
     created_on = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     # Scraping title
-    title_element = await page.query_selector('div.css-1nylpq2')
-    title = (await title_element.inner_text()).strip() if title_element else "N/A"
+    title = pdp["title"] if pdp["title"] is not None else "N/A"
 
     # Scraping URL and handling extParam
-    link = page.url
     if "?extParam" in link:
         link = link.split("?extParam")[0]
 
     # Scraping prices
-    price_elm = await page.query_selector('div.css-chstwd')
-    if price_elm:
-        original_price_elm = await price_elm.query_selector('div.original-price')
-        if original_price_elm:
-            original_price_text = await original_price_elm.inner_text()
-            original_price = convert_numbers(original_price_text.strip())
-
-            final_price_elm = await price_elm.query_selector('div.price')
-            final_price_text = await final_price_elm.inner_text()
-            final_price = convert_numbers(final_price_text.strip())
-        else:
-            final_price_elm = await price_elm.query_selector('div.price')
-            final_price_text = await final_price_elm.inner_text()
-            final_price = convert_numbers(final_price_text.strip())
-            original_price = final_price
+    if pdp["original_price"] is not None:
+        original_price = convert_numbers(pdp["original_price"])
+        final_price = convert_numbers(pdp["price"])
+    elif pdp["price"] is not None:
+        final_price = convert_numbers(pdp["price"])
+        original_price = final_price
     else:
         original_price, final_price = None, None
 
-    # Apply best promotion and adjust final price
+    # Apply best promotion and adjust final price (the price shown is kept for the dataset snapshot)
+    listed_price = final_price
     final_price = apply_best_promotion(promotions, final_price)
 
     # Scraping stock
-    oos_elm = await page.query_selector('span:text("Stok Habis")')
-    stock = 0 if oos_elm else 1
+    stock = 0 if pdp["out_of_stock"] else 1
 
     # Scraping reviews
-    average_review_elm = await page.query_selector('[data-testid="lblPDPDetailProductRatingNumber"]')
-    total_review_elm = await page.query_selector('[data-testid="lblPDPDetailProductRatingCounter"]')
-
-    if average_review_elm or total_review_elm:
-        average_review = convert_numbers((await average_review_elm.inner_text()).strip()) if average_review_elm else None
-        total_review = int(re.sub(r"\D", "", (await total_review_elm.inner_text()).strip())) if total_review_elm else 0
+    if pdp["average_review"] is not None or pdp["total_review"] is not None:
+        average_review = convert_numbers(pdp["average_review"]) if pdp["average_review"] is not None else None
+        total_review = int(re.sub(r"\D", "", pdp["total_review"])) if pdp["total_review"] is not None else 0
     else:
         average_review, total_review = None, 0
 
@@ -298,21 +737,34 @@ async def scrape_product_details(page, dealer, category, position, position_out_
         'Promotions': promotions,
         'Original Price': original_price,
         'Final Price': final_price,
+        'Listed Price': listed_price,
         'Stock': stock,
         'Average Review': average_review,
         'Total Review': total_review,
         'Created On': created_on  # Add the created_on timestamp
     })
 
+async def scrape_product_details(page, dealer, category, position, position_out_of, promotions, data_store,
+                                 variant=None, visited_pages=None):
+    """Scrapes product details like title, prices, stock, reviews, applies promotions, stores results, and adds created_on."""
+    pdp = await read_product_details(page)
+    store_product_details(pdp, page.url, dealer, category, position, position_out_of, promotions, data_store)
+
+    # Keep [variant, url, pdp fields, html] for the page cache and the next delta run
+    if visited_pages is not None:
+        html = await page.content() if toko_cache.PAGE_CACHE_MODE == "on" else None
+        visited_pages.append([variant, page.url, pdp, html])
+
 
-async def scrape_variant_combinations(page, dealer, category, position, position_out_of, promotions, data_store):
+async def scrape_variant_combinations(page, dealer, category, position, position_out_of, promotions, data_store, visited_pages=None):
     """Handles variant selection and calls scrape_product_details to store the results."""
     
     variant_sets = await page.query_selector_all('div.css-hayuji')
 
     # If no variant buttons are found, scrape the product details directly
     if not variant_sets:
-        await scrape_product_details(page, dealer, category, position, position_out_of, promotions, data_store)
+        await scrape_product_details(page, dealer, category, position, position_out_of, promotions, data_store,
+                                     visited_pages=visited_pages)
         return
 
     # Handle cases with variant buttons
@@ -320,21 +772,32 @@ async def scrape_variant_combinations(page, dealer, category, position, position
     buttons_2 = await variant_sets[1].query_selector_all('button') if len(variant_sets) >= 2 else []
 
     for btn1 in buttons_1 or [None]:
+        variant = None
         if btn1:
+            variant = (await btn1.inner_text()).strip()
             await btn1.click()
             await page.wait_for_timeout(1000)
         for btn2 in buttons_2 or [None]:
+            variant2 = variant
             if btn2:
+                variant2 = f"{variant} | {(await btn2.inner_text()).strip()}"
                 await btn2.click()
                 await page.wait_for_timeout(1000)
 
             # Scrape product details after selecting variants
-            await scrape_product_details(page, dealer, category, position, position_out_of, promotions, data_store)
+            await scrape_product_details(page, dealer, category, position, position_out_of, promotions, data_store,
+                                         variant=variant2, visited_pages=visited_pages)
 
 
 
 
-async def process_product(result, browser, semaphore, data_store, counter, total, failed_links):
+def finish_product(product_key, product_rows, data_store):
+    """Hands a finished product's rows to the export and journals them."""
+    for row in product_rows:
+        data_store.append(row)
+    JOURNAL.record_product(product_key, product_rows)
+
+async def process_product(result, pool, semaphore, data_store, counter, total, failed_links):
     """Processes a single product: access the link, scrape variants, and handle errors."""
     dealer = result['Dealer']
     category = result['Category']
@@ -343,38 +806,98 @@ async def process_product(result, browser, semaphore, data_store, counter, total
     link = result['Link']
     promotions = result['Promotions']
 
-    async with semaphore:
-        page = await browser.new_page()
+    # Finished before a restart: its export rows are in the journal
+    product_key = f"{dealer}|{category}|{link}|{position}"
+    journaled = JOURNAL.product(product_key)
+    if journaled is not None:
+        for row in journaled:
+            data_store.append(row)
 
-        errorCounter = 0
-        while True:
-            try:
-                await page.goto(link)
-                await page.reload()
-                await page.wait_for_timeout(2000)
+        counter[0] += 1
+        loading_bar(counter[0], total)
+        return
 
-                # Pass data_store to store results, including position_out_of
-                await scrape_variant_combinations(page, dealer, category, position, position_out_of, promotions, data_store)
-                break
+    # Unchanged listing card: reuse the last visit's PDP fields with today's promotions
+    signature = toko_delta.listing_signature(result['Title'], link, result.get('Listing Price'))
+    reused_pages = toko_delta.reuse(link, signature)
 
-            except Exception as e:
-                errorCounter += 1
+    if reused_pages is not None:
+        product_rows = []
+        for page_link, pdp in reused_pages:
+            store_product_details(pdp, page_link, dealer, category, position, position_out_of, promotions, product_rows)
+        finish_product(product_key, product_rows, data_store)
+
+        counter[0] += 1
+        loading_bar(counter[0], total)
+        return
+
+    # Served from the page cache when this product was crawled recently
+    try:
+        cached_pages = toko_cache.get_product(link)
+    except toko_cache.CacheMiss:
+        failed_links.append(result)
+        counter[0] += 1
+        loading_bar(counter[0], total)
+        return
+
+    if cached_pages is not None:
+        product_pdps = []
+        product_rows = []
+        for variant, page_link, html in cached_pages:
+            pdp = read_pdp(html)
+            store_product_details(pdp, page_link, dealer, category, position, position_out_of, promotions, product_rows)
+            product_pdps.append([page_link, pdp])
+        toko_delta.remember(link, signature, product_pdps)
+        finish_product(product_key, product_rows, data_store)
+
+        counter[0] += 1
+        loading_bar(counter[0], total)
+        return
+
+    async with semaphore:
+        page = await pool.acquire()
+
+        errorCounter = 0
+        # Cancelled or crashed mid-product: the page still goes back to the pool, as broken
+        finished = False
+        try:
+            while True:
+                visited_pages = []
+                # Rows of this attempt only, a failed attempt leaves nothing behind in the export
+                product_rows = []
+                try:
+                    if not await load_page(page, link, PDP_READY_SELECTOR, "product"):
+                        raise PlaywrightTimeoutError(f"{link} never showed its product details")
+
+                    # Collect the product's rows, including position_out_of
+                    await scrape_variant_combinations(page, dealer, category, position, position_out_of, promotions, product_rows, visited_pages)
+
+                    if toko_cache.PAGE_CACHE_MODE == "on":
+                        toko_cache.put_product(link, [[variant, page_link, html] for variant, page_link, pdp, html in visited_pages])
+                    toko_delta.remember(link, signature, [[page_link, pdp] for variant, page_link, pdp, html in visited_pages])
+                    finish_product(product_key, product_rows, data_store)
+                    break
+
+                except Exception as e:
+                    errorCounter += 1
+
+                if errorCounter >= 3:
+                    failed_links.append(result)
+                    break
+            finished = True
+        finally:
+            # A page that hit errors is replaced rather than handed to the next product
+            await pool.release(page, broken=errorCounter > 0 or not finished)
 
-            if errorCounter >= 3:
-                failed_links.append(result)
-                break
-        
         # Update the progress bar
         counter[0] += 1
         loading_bar(counter[0], total)
-        
-        await page.close()
 
 
 
 
 
-async def process_dealer_results_concurrently(dealer_results, browser, semaphore, data_store):
+async def process_dealer_results_concurrently(dealer_results, pool, semaphore, data_store):
     """Processes dealer results concurrently, with retry logic for failed links up to 3 times."""
     total = len(dealer_results)
     counter = [0]  # List used to keep counter mutable
@@ -382,14 +905,14 @@ async def process_dealer_results_concurrently(dealer_results, browser, semaphore
     failedCounts = 0  # Counter for the number of retries
 
     # Process the first round of links
-    tasks = [process_product(result, browser, semaphore, data_store, counter, total, failed_links) for result in dealer_results]
+    tasks = [process_product(result, pool, semaphore, data_store, counter, total, failed_links) for result in dealer_results]
     await asyncio.gather(*tasks)
 
     # Retry failed links if there are any, up to 3 times
     while failed_links and failedCounts < 3:
         total = len(failed_links)  # Reset total for retry
         counter = [0]  # Reset counter for retry
-        retry_tasks = [process_product(result, browser, semaphore, data_store, counter, total, []) for result in failed_links]
+        retry_tasks = [process_product(result, pool, semaphore, data_store, counter, total, []) for result in failed_links]
         
         # Reset failed_links for this retry attempt
         failed_links = []
@@ -420,72 +943,201 @@ async def process_dealer_results_concurrently(dealer_results, browser, semaphore
 
 ## new export
 
-async def export_to_excel(dealer, data):
-    df = pd.DataFrame(data)
-
-    if not os.path.exists(EXPORT_DATE):
-        os.makedirs(EXPORT_DATE)
-    FILENAME = f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_{dealer.lower()}.csv"
-
-    MAX_PROMOTIONS = 20
-    for i in range(1, MAX_PROMOTIONS + 1):
-        column_name = f"promotion_text_{i}"
-        df[column_name] = df["Promotions"].apply(lambda x: x[i - 1] if i - 1 < len(x) else "")
-    
-    # Drop the original "Promotions" column after splitting
-    df = df.drop(columns=["Promotions"])
-    
-    column_mapping = {
-        "Dealer": "seller",
-        "Category": "main category",
-        "Position": "position",
-        "Position Out Of": "position_out_of",
-        "Brand": "brand",
-        "Material Description": "material description",
-        "Link": "url",
-        # "Promotions": "promotion_text_1",
-        "Original Price": "old_price",
-        "Final Price": "price",
-        "Stock": "stock",
-        "Average Review": "review_avg",
-        "Total Review": "review_num",
-        "Created On": "createdon"
-    }
-
-    # Rename columns
-    df = df.rename(columns=column_mapping)
-
-    # Define all required columns, filling missing ones with blanks
-    columns = [
-        "year", "month", "sales_org", "language", "main category", "product group", "model_id", "brand",
-        "original material description", "material description", "sku", "ean", "url", "iskit", "seller", "date",
-        "price", "currency", "stock", "position", "position_out_of", "review_num", "review_avg", "screen size",
-        "technology", "quality", "size segment", "size segment (gfk)", "misc_1", "misc_2", "misc_3", "misc_4",
-        "misc_5", "promotion_text_1", "promotion_text_1_en", "promotion_text_10", "promotion_text_10_en",
-        "promotion_text_11", "promotion_text_11_en", "promotion_text_12", "promotion_text_12_en", "promotion_text_13",
-        "promotion_text_13_en", "promotion_text_14", "promotion_text_14_en", "promotion_text_15", "promotion_text_15_en",
-        "promotion_text_16", "promotion_text_16_en", "promotion_text_17", "promotion_text_17_en", "promotion_text_18",
-        "promotion_text_18_en", "promotion_text_19", "promotion_text_19_en", "promotion_text_2", "promotion_text_2_en",
-        "promotion_text_3", "promotion_text_3_en", "promotion_text_4", "promotion_text_4_en", "promotion_text_5",
-        "promotion_text_5_en", "promotion_text_6", "promotion_text_6_en", "promotion_text_7", "promotion_text_7_en",
-        "promotion_text_8", "promotion_text_8_en", "promotion_text_9", "promotion_text_9_en", "promotion_text_line",
-        "promotion_text_line_en", "trade in scheme", "trade in scheme_en", "misc_10", "misc_11", "misc_12", "misc_13",
-        "misc_14", "misc_15", "misc_16", "misc_17", "misc_18", "misc_19", "misc_20", "misc_6", "misc_7", "misc_8",
-        "misc_9", "discount%", "discount_amount", "old_price", "marketingdatacreatedon", "createdon"
-    ]
-
-    # Add any missing columns as blanks
-    for col in columns:
-        if col not in df.columns:
-            df[col] = ""
-
-    # Reorder DataFrame columns and save as .xlsb with '|' delimiter
-    df = df[columns]
-    df.to_csv(FILENAME, sep="|", index=False, encoding="utf-8", header=True, quotechar='"', quoting=1)
+MAX_PROMOTIONS = 20
+
+EXPORT_COLUMN_MAPPING = {
+    "Dealer": "seller",
+    "Category": "main category",
+    "Position": "position",
+    "Position Out Of": "position_out_of",
+    "Brand": "brand",
+    "Material Description": "material description",
+    "Link": "url",
+    # "Promotions": "promotion_text_1",
+    "Original Price": "old_price",
+    "Final Price": "price",
+    "Stock": "stock",
+    "Average Review": "review_avg",
+    "Total Review": "review_num",
+    "Created On": "createdon"
+}
+
+# All required columns, the ones we don't fill stay blank
+EXPORT_COLUMNS = [
+    "year", "month", "sales_org", "language", "main category", "product group", "model_id", "brand",
+    "original material description", "material description", "sku", "ean", "url", "iskit", "seller", "date",
+    "price", "currency", "stock", "position", "position_out_of", "review_num", "review_avg", "screen size",
+    "technology", "quality", "size segment", "size segment (gfk)", "misc_1", "misc_2", "misc_3", "misc_4",
+    "misc_5", "promotion_text_1", "promotion_text_1_en", "promotion_text_10", "promotion_text_10_en",
+    "promotion_text_11", "promotion_text_11_en", "promotion_text_12", "promotion_text_12_en", "promotion_text_13",
+    "promotion_text_13_en", "promotion_text_14", "promotion_text_14_en", "promotion_text_15", "promotion_text_15_en",
+    "promotion_text_16", "promotion_text_16_en", "promotion_text_17", "promotion_text_17_en", "promotion_text_18",
+    "promotion_text_18_en", "promotion_text_19", "promotion_text_19_en", "promotion_text_2", "promotion_text_2_en",
+    "promotion_text_3", "promotion_text_3_en", "promotion_text_4", "promotion_text_4_en", "promotion_text_5",
+    "promotion_text_5_en", "promotion_text_6", "promotion_text_6_en", "promotion_text_7", "promotion_text_7_en",
+    "promotion_text_8", "promotion_text_8_en", "promotion_text_9", "promotion_text_9_en", "promotion_text_line",
+    "promotion_text_line_en", "trade in scheme", "trade in scheme_en", "misc_10", "misc_11", "misc_12", "misc_13",
+    "misc_14", "misc_15", "misc_16", "misc_17", "misc_18", "misc_19", "misc_20", "misc_6", "misc_7", "misc_8",
+    "misc_9", "discount%", "discount_amount", "old_price", "marketingdatacreatedon", "createdon"
+]
+
+## declared types of the columns we fill, everything else in EXPORT_COLUMNS is always blank
+EXPORT_DTYPES = {
+    "seller": "category",
+    "main category": "category",
+    "brand": "category",
+    "material description": "object",
+    "url": "object",
+    "price": "float64",
+    "old_price": "float64",
+    "stock": "int64",
+    "position": "int64",
+    "position_out_of": "int64",
+    "review_num": "int64",
+    "review_avg": "float64",
+    "createdon": "object",
+}
+EXPORT_DTYPES.update({f"promotion_text_{i}": "object" for i in range(1, MAX_PROMOTIONS + 1)})
+
+## the fields the daily dataset snapshot needs, kept after the rows themselves are written out
+SNAPSHOT_FIELDS = ["Dealer", "Category", "Position", "Material Description", "Brand", "Link",
+                   "Listed Price", "Original Price", "Stock", "Average Review", "Total Review", "Created On"]
+
+def export_filename(dealer, suffix=""):
+    ## the listing-only pulse runs several times a day, so it gets a time stamp and never blocks the daily file
+    if suffix:
+        suffix += datetime.now().strftime("_%H%M")
+    return f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_{dealer.lower()}{suffix}.csv"
+
+def export_frame(rows):
+    """Result rows -> the filled export columns with their declared types, promotions exploded in one step."""
+    typed = {}
+    for field, col in EXPORT_COLUMN_MAPPING.items():
+        values = [row.get(field) for row in rows]
+        dtype = EXPORT_DTYPES[col]
+        ## a missing count makes the column float, as it always came out in the csv
+        if dtype == "int64" and any(value is None or value != value for value in values):
+            dtype = "float64"
+        ## built straight in the declared type, text columns keep referencing the row strings
+        typed[col] = pd.Series(values, dtype=dtype)
+
+    # Split "Promotions" into promotion_text_N at once; columns past the longest list stay blank until write time
+    promotions = pd.DataFrame([row["Promotions"] for row in rows], dtype=object)
+    for i in promotions.columns[:MAX_PROMOTIONS]:
+        typed[f"promotion_text_{i + 1}"] = promotions[i].fillna("")
+
+    return pd.DataFrame(typed)
+
+def csv_values(values):
+    """A column as the cells pandas' to_csv would write: floats via numpy str, missing as blank."""
+    missing = values.isna().to_numpy()
+    if values.dtype.kind == "f":
+        cells = values.to_numpy().astype(str)
+    else:
+        cells = values.to_numpy(dtype=object)
+    if missing.any():
+        cells = cells.astype(object)
+        cells[missing] = ""
+    return cells
+
+def write_export(df, filename, header, chunk_size=10000):
+    """Writes the export csv (header optional, appending otherwise); blank columns are only produced here."""
+    with open(filename, "w" if header else "a", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter="|", quotechar='"', quoting=csv.QUOTE_ALL, lineterminator=os.linesep)
+        if header:
+            writer.writerow(EXPORT_COLUMNS)
+
+        ## cells are formatted a chunk of rows at a time, the blank columns are the same "" object throughout
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            columns = [csv_values(chunk[col]) if col in chunk.columns else itertools.repeat("") for col in EXPORT_COLUMNS]
+            writer.writerows(zip(*columns))
+
+class ExportWriter:
+    """Streams result rows into the dealer's pipe-delimited csv while the crawl goes on.
+
+    Rows are buffered and every BATCH_SIZE of them is converted and appended by a single
+    writer thread, so the event loop never waits on the disk. The csv is written under a
+    .part name and only renamed once complete, so an interrupted run doesn't look finished.
+    """
+
+    BATCH_SIZE = 2000
+
+    def __init__(self, dealer, suffix="", filename=None):
+        if not os.path.exists(EXPORT_DATE):
+            os.makedirs(EXPORT_DATE)
+        self.filename = filename or export_filename(dealer, suffix)
+        self.part_filename = self.filename + ".part"
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.buffer = []
+        self.row_count = 0
+        self.header_written = False
+        self.writes = []
+        self.snapshot_rows = []
+
+    def __len__(self):
+        return self.row_count
+
+    def append(self, row):
+        self.buffer.append(row)
+        self.snapshot_rows.append(tuple(row.get(field) for field in SNAPSHOT_FIELDS))
+        self.row_count += 1
+        if len(self.buffer) >= self.BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Hands the buffered rows to the writer thread (batches are written in order)."""
+        if not self.buffer and self.header_written:
+            return
+        rows, self.buffer = self.buffer, []
+        self.writes.append(self.executor.submit(self._write, rows, not self.header_written))
+        self.header_written = True
+
+    def _write(self, rows, header):
+        df = export_frame(rows) if rows else pd.DataFrame()
+        write_export(df, self.part_filename, header)
+
+    async def close(self):
+        self.flush()
+        ## wait for the writer thread without blocking the loop, a failed batch raises here
+        for write in self.writes:
+            await asyncio.wrap_future(write)
+        await asyncio.wrap_future(self.executor.submit(os.replace, self.part_filename, self.filename))
+        self.executor.shutdown()
+
+async def export_to_excel(dealer, data, suffix=""):
+    writer = ExportWriter(dealer, suffix)
+    for row in data:
+        writer.append(row)
+    await writer.close()
 
 # Example usage:
 # export_to_xlsb(df, "/mnt/data/output_file.xlsb")
 
+def write_snapshot(dealer, data):
+    """Adds the dealer's rows (result dicts or SNAPSHOT_FIELDS tuples) to the daily dataset, one partition per category."""
+    if not data:
+        return
+    df = pd.DataFrame(data, columns=SNAPSHOT_FIELDS)
+    snapshot = pd.DataFrame({
+        "Date": pd.to_datetime(df["Created On"]).dt.date,
+        "Dealer Site": df["Dealer"],
+        "Category": df["Category"],
+        "Material Description": df["Material Description"],
+        "Brand": df["Brand"],
+        "Link": df["Link"],
+        # Before promotions, the same price the Selenium crawler records
+        "Final Price": df["Listed Price"],
+        "Original Price": df["Original Price"],
+        "Stock": df["Stock"],
+        "Average Rating": df["Average Review"],
+        "Total Review": df["Total Review"],
+        "Model Position": df["Position"],
+    }, columns=toko_dataset.DATA_COLUMNS)
+
+    for category, rows in snapshot.groupby("Category", sort=False):
+        toko_dataset.write_partition(rows, EXPORT_DATE, dealer, category, CRAWLER)
+
 
 async def scrape_dealer(dealer, dealer_dict):
     """Scrapes all categories and links for a dealer, stores data, and exports it to Excel."""
@@ -498,24 +1150,42 @@ async def scrape_dealer(dealer, dealer_dict):
             "--disable-blink-features=AutomationControlled"
         ])
         semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+        pool = PagePool(browser, MAX_CONCURRENT_TASKS)
         const = "?perpage=80"
 
         # Initialize dealer-specific results and data store
         dealer_results = []
-        data_store = []  # This will store the results for each dealer
+        # Rows go straight to the dealer's csv as products finish
+        data_store = ExportWriter(dealer, "_listing" if LISTING_ONLY_MODE else "")
 
         # Scrape each category for the current dealer
         for category, links in dealer_dict.items():
-            category_results = await scrape_category(semaphore, browser, links, const, dealer, category)
+            category_results = await scrape_category(semaphore, pool, links, const, dealer, category)
             dealer_results.extend(category_results)  # Collect all category results for the dealer
 
+        # Listing-only mode: most rows come straight from the cards
+        pdp_results = dealer_results
+        if LISTING_ONLY_MODE:
+            pdp_results = store_listing_results(dealer_results, data_store)
+
         # After scraping category pages, process product details concurrently
-        await process_dealer_results_concurrently(dealer_results, browser, semaphore, data_store)
+        await process_dealer_results_concurrently(pdp_results, pool, semaphore, data_store)
+
+        # After scraping, finish the dealer's csv export
+        await data_store.close()
 
-        # After scraping, export the results to an Excel file (one file per dealer)
-        await export_to_excel(dealer, data_store)
+        # The full crawl is also the day's price history snapshot (the listing pulse lacks review counts)
+        if not LISTING_ONLY_MODE:
+            write_snapshot(dealer, data_store.snapshot_rows)
+        toko_delta.save_store()
 
+        await pool.close()
         await browser.close()
+        # Per dealer reports
+        print_resource_report(resource_log)
+        print_ready_report(ready_log)
+        resource_log.clear()
+        ready_log.clear()
         return dealer_results
 
 
@@ -523,13 +1193,15 @@ async def main():
 
     for dealer, categories in dealer_dictionary.items():
 
-        if os.path.exists(f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_{dealer.lower()}.csv"):
+        if not LISTING_ONLY_MODE and os.path.exists(f"{EXPORT_DATE}\{EXPORT_DATE}_ID_toko_{dealer.lower()}.csv"):
             print(f"{dealer.lower()} found!")
             continue  
 
         print(f"\n ==> Starting to scrape dealer: {dealer}")
         dealer_results = await scrape_dealer(dealer, categories)
 
+    JOURNAL.close()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
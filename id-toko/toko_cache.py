@@ -0,0 +1,131 @@
+## ===== Importing Libraries =====
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+## ===== Page cache settings =====
+
+## "on": serve fresh entries and store new fetches, "replay": serve only from the cache, "off": bypass it
+PAGE_CACHE_MODE = os.environ.get("TOKO_CACHE_MODE", "on")
+PAGE_CACHE_DIR = os.environ.get("TOKO_CACHE_DIR", "page_cache")
+
+## seconds before an entry counts as stale and the page is fetched again (ignored in replay mode)
+PAGE_CACHE_TTL = {
+    "listing": 3 * 60 * 60,
+    "pdp": 12 * 60 * 60,
+}
+
+## query parameters that only track where the click came from
+IGNORED_PARAMS = {"extParam", "src", "whid", "refined", "utm_source", "utm_medium", "utm_campaign"}
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a page was never cached."""
+
+## ===== Keys =====
+
+def normalize_url(url):
+    """Lower-cases scheme/host, drops the fragment and tracking params and sorts the query."""
+    parts = urlsplit(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS)
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+def cache_key(url, variant=None):
+    key_source = normalize_url(url)
+    if variant is not None:
+        key_source += "\n" + variant
+    return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+def entry_path(key):
+    return os.path.join(PAGE_CACHE_DIR, key[:2], key + ".json.gz")
+
+## ===== Reading and writing entries =====
+
+def read_entry(url, page_type, variant=None):
+    """Returns the cached entry, or None when it is missing or older than the page type's TTL."""
+    if PAGE_CACHE_MODE == "off":
+        return None
+
+    path = entry_path(cache_key(url, variant))
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, OSError, ValueError):
+        entry = None
+
+    if entry is not None and PAGE_CACHE_MODE != "replay":
+        if time.time() - entry["fetched"] > PAGE_CACHE_TTL[page_type]:
+            entry = None
+
+    if entry is None and PAGE_CACHE_MODE == "replay":
+        raise CacheMiss(f"{page_type} page not in cache: {url}" + (f" [{variant}]" if variant else ""))
+
+    return entry
+
+def write_entry(url, page_type, html, final_url=None, variant=None, variants=None):
+    if PAGE_CACHE_MODE != "on":
+        return
+
+    entry = {
+        "url": normalize_url(url),
+        "type": page_type,
+        "variant": variant,
+        "final_url": final_url or url,
+        "fetched": time.time(),
+        "html": html,
+    }
+    if variants is not None:
+        entry["variants"] = variants
+
+    path = entry_path(cache_key(url, variant))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    ## write next to the target and swap in, so a crash never leaves half an entry behind
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+
+## ===== Page helpers =====
+
+def get_listing(url):
+    """Cached html of a listing page, or None."""
+    entry = read_entry(url, "listing")
+    return entry["html"] if entry else None
+
+def put_listing(url, html):
+    write_entry(url, "listing", html)
+
+def get_product(link):
+    """Cached [variant, final url, html] for every variant page of a product, or None if any is missing."""
+    base = read_entry(link, "pdp")
+    if base is None:
+        return None
+
+    if not base.get("variants"):
+        return [[None, base["final_url"], base["html"]]]
+
+    pages = []
+    for variant in base["variants"]:
+        entry = read_entry(link, "pdp", variant)
+        if entry is None:
+            return None
+        pages.append([variant, entry["final_url"], entry["html"]])
+    return pages
+
+def put_product(link, pages):
+    """Stores a product's pages, given as [variant, final url, html] (variant None when it has none)."""
+    if not pages:
+        return
+
+    variants = [page[0] for page in pages if page[0] is not None]
+    for variant, final_url, html in pages:
+        if variant is not None:
+            write_entry(link, "pdp", html, final_url, variant)
+
+    ## the base entry goes in last: it is what marks the product as complete
+    write_entry(link, "pdp", pages[0][2], pages[0][1], variants=variants)
@@ -0,0 +1,241 @@
+## ===== Importing Libraries =====
+
+import re
+import os
+from urllib.parse import urlsplit, urlunsplit
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+## one copy for both crawlers, in the repo's crawler_common package (pip install -e . from the repo root)
+from crawler_common import BrandMatcher, RecordAccumulator
+
+## "lxml" parses with lxml (listing pages keep only the product card subtrees), "html.parser" is the
+## original pure-python BeautifulSoup path and is used automatically when lxml is not installed
+try:
+    import lxml.html
+    PARSER_BACKEND = "lxml"
+except ImportError:
+    PARSER_BACKEND = "html.parser"
+
+## ===== Base URL override =====
+
+## e.g. TOKO_BASE_URL=http://127.0.0.1:8800 to crawl benchmarks/replay_server.py instead of the live site
+TOKO_BASE_URL = os.environ.get("TOKO_BASE_URL")
+
+def rebase_url(url, base_url=None):
+    """Swaps the scheme and host of url for base_url (keeps path and query), a no-op when unset."""
+    base_url = base_url or TOKO_BASE_URL
+    if not base_url:
+        return url
+
+    parts = urlsplit(url)
+    base = urlsplit(base_url)
+    return urlunsplit((base.scheme, base.netloc, parts.path, parts.query, parts.fragment))
+
+## ===== Resource blocking =====
+
+## "off" (or "0" / "false") loads every request like a normal browser
+RESOURCE_BLOCKING = os.environ.get("TOKO_BLOCK_RESOURCES", "on")
+
+## request types the crawlers never read (Playwright's resource types)
+BLOCKED_RESOURCE_TYPES = ["image", "media", "font"]
+
+## third-party trackers and ads, a host matches its domain and every subdomain
+BLOCKED_DOMAINS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "googleadservices.com", "facebook.net", "facebook.com", "connect.facebook.net", "analytics.tiktok.com",
+    "hotjar.com", "clarity.ms", "branch.io", "criteo.com", "criteo.net", "scorecardresearch.com",
+    "newrelic.com", "nr-data.net",
+]
+
+## never blocked, whatever the type or domain lists say
+ALLOWED_DOMAINS = []
+
+## what Chrome can't tell by type: Selenium blocks these by url pattern instead
+BLOCKED_EXTENSIONS = {
+    "image": ["jpg", "jpeg", "png", "gif", "webp", "avif", "svg", "ico"],
+    "media": ["mp4", "webm", "m3u8", "mp3"],
+    "font": ["woff", "woff2", "ttf", "otf", "eot"],
+}
+
+def _env_list(name, default):
+    ## comma separated, a leading "+" adds to the defaults instead of replacing them
+    value = os.environ.get(name)
+    if value is None:
+        return list(default)
+    items = [item.strip() for item in value.lstrip("+").split(",") if item.strip()]
+    return list(default) + items if value.startswith("+") else items
+
+class ResourcePolicy:
+    """Which requests a crawler page drops: by resource type, by domain, with an allow list on top.
+
+    Lists come from TOKO_BLOCK_TYPES / TOKO_BLOCK_DOMAINS / TOKO_ALLOW_DOMAINS (comma separated,
+    "+a,b" to extend the defaults), TOKO_BLOCK_RESOURCES=off (or 0 / false) turns blocking off.
+    """
+
+    def __init__(self, types=None, deny=None, allow=None, enabled=None):
+        self.enabled = (RESOURCE_BLOCKING.lower() not in ("off", "0", "false")) if enabled is None else enabled
+        self.types = set(_env_list("TOKO_BLOCK_TYPES", BLOCKED_RESOURCE_TYPES) if types is None else types)
+        self.deny = _env_list("TOKO_BLOCK_DOMAINS", BLOCKED_DOMAINS) if deny is None else list(deny)
+        self.allow = _env_list("TOKO_ALLOW_DOMAINS", ALLOWED_DOMAINS) if allow is None else list(allow)
+
+    @staticmethod
+    def _matches(host, domains):
+        return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+    def blocks(self, url, resource_type):
+        if not self.enabled:
+            return False
+        host = (urlsplit(url).hostname or "").lower()
+        if self._matches(host, self.allow):
+            return False
+        return resource_type in self.types or self._matches(host, self.deny)
+
+    def url_patterns(self):
+        """The policy as Chrome's Network.setBlockedURLs wildcards (allowed domains are left out of the domain list)."""
+        if not self.enabled:
+            return []
+        patterns = [f"*.{ext}*" for kind in sorted(self.types) for ext in BLOCKED_EXTENSIONS.get(kind, [])]
+        patterns += [f"*://{domain}/*" for domain in self.deny if not self._matches(domain, self.allow)]
+        patterns += [f"*.{domain}/*" for domain in self.deny if not self._matches(domain, self.allow)]
+        return patterns
+
+def print_resource_report(resource_log):
+    """resource_log: [url, blocked requests, bytes loaded] per page visit."""
+    if not resource_log:
+        return
+    blocked = sum(x[1] for x in resource_log)
+    loaded = sum(x[2] for x in resource_log)
+    print(f"Blocked requests: {blocked} ({blocked / len(resource_log):.1f}/page over {len(resource_log)} pages), "
+          f"loaded: {loaded / 1024 / 1024:.1f} MiB ({loaded / len(resource_log) / 1024:.0f} KiB/page)")
+
+## ===== Masterlist matching =====
+
+class PartialMatcher:
+    """Tells whether a string is contained in, or contains, any of a fixed list of strings.
+
+    Same answer as `any(other in text or text in other for other in values)`, but
+    each value is indexed by its character n-grams, so a lookup only verifies the
+    few values sharing the query's rarest n-gram instead of scanning the list.
+    """
+
+    def __init__(self, values, gram_size=4):
+        self.gram_size = gram_size
+        self.values = [value for value in dict.fromkeys(values) if isinstance(value, str)]
+        self.exact = set(self.values)
+
+        ## n-gram -> ids of the values containing it
+        self.postings = {}
+        ## values too short to have an n-gram, checked one by one
+        self.short_values = []
+        value_grams = []
+        for value_id, value in enumerate(self.values):
+            grams = self.grams(value)
+            value_grams.append(grams)
+            if not grams:
+                self.short_values.append(value)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(value_id)
+
+        ## n-gram -> values anchored on it: a value inside the query contains its rarest n-gram too
+        self.anchors = {}
+        frequency = {gram: len(ids) for gram, ids in self.postings.items()}
+        for value, grams in zip(self.values, value_grams):
+            if grams:
+                self.anchors.setdefault(min(grams, key=frequency.__getitem__), []).append(value)
+
+    def grams(self, text):
+        return {text[i:i + self.gram_size] for i in range(len(text) - self.gram_size + 1)}
+
+    def matches(self, text):
+        if not isinstance(text, str):
+            return False
+        if text in self.exact:
+            return True
+        if any(value in text for value in self.short_values):
+            return True
+
+        if len(text) < self.gram_size:
+            return any(text in value for value in self.values)
+
+        grams = self.grams(text)
+
+        ## some value inside the text
+        for gram in grams:
+            if any(value in text for value in self.anchors.get(gram, ())):
+                return True
+
+        ## the text inside some value: every one of its n-grams is in there, start from the rarest
+        candidates = min((self.postings.get(gram, ()) for gram in grams), key=len)
+        return any(text in self.values[value_id] for value_id in candidates)
+
+## ===== HTML parsing =====
+
+## listing page nodes: product cards and the two empty-state markers
+LISTING_NODES = SoupStrainer("div", class_=[
+    "css-1sn1xa2",
+    "css-3ytcpr-unf-emptystate e1mmy8p70",
+    "css-e7ogvg-unf-emptystate e1mmy8p70",
+])
+
+def make_soup(html, only=None):
+    """BeautifulSoup on the configured backend; with only= just the matching subtrees are built."""
+    if PARSER_BACKEND == "lxml":
+        return BeautifulSoup(html, "lxml", parse_only=only)
+    return BeautifulSoup(html, "html.parser")
+
+def read_pdp(html):
+    """Pulls the product page fields scrape_page needs as stripped text (None when the node is missing)."""
+    if PARSER_BACKEND == "lxml":
+        return _read_pdp_lxml(html)
+    return _read_pdp_soup(BeautifulSoup(html, "html.parser"))
+
+def _read_pdp_soup(soup):
+    def text(elm):
+        return elm.text.strip() if elm else None
+
+    price_elm = soup.find("div", class_="css-chstwd")
+
+    return {
+        "title": text(soup.find("div", class_="css-1nylpq2")),
+        "original_price": text(price_elm.find("div", class_="original-price")) if price_elm else None,
+        "price": text(price_elm.find("div", class_="price")) if price_elm else None,
+        "out_of_stock": soup.find("span", string="Stok Habis") is not None,
+        "average_review": text(soup.find(attrs={"data-testid": "lblPDPDetailProductRatingNumber"})),
+        "total_review": text(soup.find(attrs={"data-testid": "lblPDPDetailProductRatingCounter"})),
+    }
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def _single_string(elm):
+    ## same rule as BeautifulSoup's .string: the text of a node with exactly one child, recursively
+    if len(elm) == 0:
+        return elm.text
+    if len(elm) == 1 and not elm.text and not elm[0].tail:
+        return _single_string(elm[0])
+    return None
+
+def _read_pdp_lxml(html):
+    try:
+        tree = lxml.html.fromstring(html)
+    except lxml.etree.ParserError:
+        ## empty / non-html page source
+        return _read_pdp_soup(BeautifulSoup(html, "html.parser"))
+
+    def first(nodes):
+        return nodes[0] if nodes else None
+
+    def text(elm):
+        return elm.text_content().strip() if elm is not None else None
+
+    price_elm = first(tree.xpath(f"//div[{_has_class('css-chstwd')}]"))
+
+    return {
+        "title": text(first(tree.xpath(f"//div[{_has_class('css-1nylpq2')}]"))),
+        "original_price": text(first(price_elm.xpath(f".//div[{_has_class('original-price')}]"))) if price_elm is not None else None,
+        "price": text(first(price_elm.xpath(f".//div[{_has_class('price')}]"))) if price_elm is not None else None,
+        "out_of_stock": any(_single_string(span) == "Stok Habis" for span in tree.xpath("//span[contains(., 'Stok Habis')]")),
+        "average_review": text(first(tree.xpath("//*[@data-testid='lblPDPDetailProductRatingNumber']"))),
+        "total_review": text(first(tree.xpath("//*[@data-testid='lblPDPDetailProductRatingCounter']"))),
+    }
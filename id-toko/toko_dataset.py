@@ -0,0 +1,100 @@
+## ===== Importing Libraries =====
+
+import os
+from urllib.parse import quote
+
+## ===== Dataset settings =====
+
+## one Parquet file per crawl of a dealer/category by each crawler:
+## <dir>/date=YYYYMMDD/dealer=<dealer>/category=<category>/crawler=<crawler>/part-0.parquet
+DATASET_DIR = os.environ.get("TOKO_DATASET_DIR", "toko_dataset")
+
+PARTITION_COLUMNS = ["date", "dealer", "category", "crawler"]
+
+## the row layout of both crawlers' partitions; "Final Price" is the price the PDP shows, before any promotion
+DATA_COLUMNS = [
+        "Date",
+        "Dealer Site",
+        "Category",
+        "Material Description",
+        "Brand",
+        "Link",
+        "Final Price",
+        "Original Price",
+        "Stock",
+        "Average Rating",
+        "Total Review",
+        "Model Position",
+    ]
+
+## declared up front so every partition has the same schema, whatever a crawl happened to find
+COLUMN_TYPES = {
+    "Date": "date32",
+    "Final Price": "float64",
+    "Original Price": "float64",
+    "Stock": "int64",
+    "Average Rating": "float64",
+    "Total Review": "int64",
+    "Model Position": "int64",
+}
+
+## ===== Writing =====
+
+def partition_dir(date, dealer, category, crawler):
+    ## dealer/category names are uri-encoded, which is what the hive partitioning decodes on read
+    parts = [f"{name}={quote(str(value), safe='')}" for name, value in zip(PARTITION_COLUMNS, [date, dealer, category, crawler])]
+    return os.path.join(DATASET_DIR, *parts)
+
+def partition_dates():
+    """Crawl dates in the dataset, oldest first, from the directory names alone."""
+    if not os.path.exists(DATASET_DIR):
+        return []
+    return sorted(name[len("date="):] for name in os.listdir(DATASET_DIR) if name.startswith("date="))
+
+def partition_exists(date, dealer, category, crawler):
+    return os.path.exists(os.path.join(partition_dir(date, dealer, category, crawler), "part-0.parquet"))
+
+def make_schema(columns):
+    import pyarrow as pa
+
+    return pa.schema([(col, getattr(pa, COLUMN_TYPES.get(col, "string"))()) for col in columns])
+
+def write_partition(df, date, dealer, category, crawler):
+    """Writes (or replaces) one crawler's dealer/category crawl of the day; the other crawler's is left alone."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, schema=make_schema(df.columns), preserve_index=False)
+
+    path = os.path.join(partition_dir(date, dealer, category, crawler), "part-0.parquet")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    ## dot-prefixed, so a scan running meanwhile skips the half-written file
+    tmp_path = os.path.join(os.path.dirname(path), f".part-0.{os.getpid()}.tmp")
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+## ===== Reading =====
+
+def scan():
+    """The whole dataset as a lazy pyarrow dataset, partition keys included as columns."""
+    import pyarrow.dataset as ds
+
+    return ds.dataset(DATASET_DIR, format="parquet", partitioning="hive")
+
+def read(date=None, dealer=None, category=None, crawler=None, columns=None):
+    """Rows of the matching partitions as a DataFrame; only those files are opened."""
+    import pyarrow.dataset as ds
+
+    if not os.path.exists(DATASET_DIR):
+        return None
+
+    condition = None
+    for name, value in zip(PARTITION_COLUMNS, [date, dealer, category, crawler]):
+        if value is not None:
+            ## partition values come back typed (a date like 20240501 as an integer), compare as text
+            term = ds.field(name).cast("string") == str(value)
+            condition = term if condition is None else condition & term
+
+    table = scan().to_table(columns=columns, filter=condition)
+    return table.drop_columns([name for name in PARTITION_COLUMNS if name in table.column_names]).to_pandas(date_as_object=False)
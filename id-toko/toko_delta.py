@@ -0,0 +1,88 @@
+## ===== Importing Libraries =====
+
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from toko_cache import normalize_url
+
+## ===== Delta crawl settings =====
+
+## "on": products whose listing card (title, link, price) is unchanged reuse the last PDP visit
+DELTA_MODE = os.environ.get("TOKO_DELTA_MODE", "off") == "on"
+DELTA_STORE = os.environ.get("TOKO_DELTA_STORE", "pdp_delta.json.gz")
+
+## an unchanged product still gets a fresh PDP visit once its stored fields are this old
+DELTA_MAX_AGE_DAYS = float(os.environ.get("TOKO_DELTA_MAX_AGE_DAYS", 3))
+
+## normalized link -> {"variants", "signature", "visited", "pages": [[page link, pdp fields], ...]}
+## "variants" is kept on every crawl (listing-only mode reads it), the rest only with DELTA_MODE
+delta_store = None
+
+## ===== Store =====
+
+def load_store():
+    global delta_store
+    if delta_store is None:
+        try:
+            with gzip.open(DELTA_STORE, "rt", encoding="utf-8") as f:
+                delta_store = json.load(f)
+        except (FileNotFoundError, OSError, ValueError):
+            delta_store = {}
+    return delta_store
+
+def save_store():
+    if delta_store is None:
+        return
+
+    tmp_path = f"{DELTA_STORE}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(delta_store, f)
+    os.replace(tmp_path, DELTA_STORE)
+
+## ===== Listing signatures =====
+
+def listing_signature(title, link, price):
+    """What the listing card shows: any change in title, link or displayed price means a new PDP visit."""
+    price = "" if price is None else str(price)
+    key_source = "\n".join([" ".join(str(title).split()), normalize_url(link), "".join(c for c in price if c.isdigit())])
+    return hashlib.sha1(key_source.encode("utf-8")).hexdigest()
+
+def reuse(link, signature):
+    """Stored [page link, pdp fields] pairs for an unchanged, recently visited product, else None."""
+    if not DELTA_MODE:
+        return None
+
+    entry = load_store().get(normalize_url(link))
+    if entry is None or entry.get("signature") != signature:
+        return None
+    if time.time() - entry["visited"] > DELTA_MAX_AGE_DAYS * 24 * 60 * 60:
+        return None
+    return entry["pages"]
+
+def remember(link, signature, pages):
+    """Records the product's variant count after a visit, and with DELTA_MODE its PDP fields; pages are [page link, pdp fields] per variant."""
+    if not pages:
+        return
+
+    store = load_store()
+    key = normalize_url(link)
+    if DELTA_MODE:
+        store[key] = {
+            "variants": len(pages),
+            "signature": signature,
+            "visited": time.time(),
+            "pages": pages,
+        }
+    else:
+        ## only the count: a delta entry from an earlier run keeps its pages for the next delta run
+        store.setdefault(key, {})["variants"] = len(pages)
+
+def variant_count(link):
+    """Variant pages found by the last recorded PDP visit of this product, or None if it was never visited."""
+    entry = load_store().get(normalize_url(link))
+    if entry is None:
+        return None
+    return entry.get("variants", len(entry.get("pages", [])))
@@ -0,0 +1,119 @@
+## ===== Importing Libraries =====
+
+import argparse
+
+import toko_dataset
+
+## ===== Price history queries =====
+## The dataset's date partitions are the daily snapshots: a crawl only ever (re)writes its own day,
+## so earlier days are never touched. Queries read just the columns and days they need and join
+## the snapshots in Arrow.
+
+KEY_COLUMNS = ["Dealer Site", "Category", "Link"]
+VALUE_COLUMNS = ["Material Description", "Final Price", "Original Price", "Stock"]
+
+def previous_date(date):
+    """The latest crawl date before `date`, or None."""
+    earlier = [d for d in toko_dataset.partition_dates() if d < str(date)]
+    return earlier[-1] if earlier else None
+
+def snapshot(date, dealer=None, category=None, crawler=None):
+    """One day's rows as an Arrow table, one row per dealer/category/link (of either crawler unless one is given)."""
+    import pyarrow.dataset as ds
+
+    condition = ds.field("date").cast("string") == str(date)
+    if dealer is not None:
+        condition &= ds.field("dealer").cast("string") == str(dealer)
+    if category is not None:
+        condition &= ds.field("category").cast("string") == str(category)
+    if crawler is not None:
+        condition &= ds.field("crawler").cast("string") == str(crawler)
+
+    table = toko_dataset.scan().to_table(columns=KEY_COLUMNS + VALUE_COLUMNS, filter=condition)
+
+    ## variants share a link: keep the cheapest row of each (ordered grouping, so "first" follows the sort)
+    table = table.sort_by([("Final Price", "ascending")])
+    table = table.group_by(KEY_COLUMNS, use_threads=False).aggregate([(col, "first") for col in VALUE_COLUMNS])
+    return table.rename_columns([name[:-len("_first")] if name.endswith("_first") else name for name in table.column_names])
+
+def compare(date, previous=None, dealer=None, category=None, crawler=None):
+    """Today's and the previous snapshot joined on dealer/category/link (columns suffixed _prev)."""
+    previous = previous or previous_date(date)
+    if previous is None:
+        return None
+
+    today = snapshot(date, dealer, category, crawler)
+    before = snapshot(previous, dealer, category, crawler).select(KEY_COLUMNS + ["Final Price", "Stock"])
+    return today.join(before, keys=KEY_COLUMNS, join_type="inner", right_suffix="_prev")
+
+def price_history(link, since=None, columns=None):
+    """Every crawled price of one product, oldest first."""
+    import pyarrow.dataset as ds
+
+    columns = columns or ["Date", "Dealer Site", "Category", "Final Price", "Original Price", "Stock", "crawler"]
+    condition = ds.field("Link") == link
+    if since is not None:
+        condition &= ds.field("date").cast("string") >= str(since)
+
+    table = toko_dataset.scan().to_table(columns=columns, filter=condition)
+    return table.sort_by([("Date", "ascending")]).to_pandas(date_as_object=False)
+
+def price_drops(date, previous=None, dealer=None, category=None, min_drop=0, crawler=None):
+    """Products whose final price fell since the previous crawl, biggest drop first."""
+    import pyarrow.compute as pc
+
+    joined = compare(date, previous, dealer, category, crawler)
+    if joined is None:
+        return None
+
+    drop = pc.subtract(joined["Final Price_prev"], joined["Final Price"])
+    joined = joined.append_column("Drop", drop).filter(pc.greater(drop, min_drop))
+    joined = joined.append_column("Drop %", pc.round(pc.multiply(pc.divide(joined["Drop"], joined["Final Price_prev"]), 100), 1))
+    return joined.sort_by([("Drop", "descending")]).to_pandas()
+
+def stock_flips(date, previous=None, dealer=None, category=None, crawler=None):
+    """Products that went out of stock or came back since the previous crawl."""
+    import pyarrow.compute as pc
+
+    joined = compare(date, previous, dealer, category, crawler)
+    if joined is None:
+        return None
+
+    joined = joined.filter(pc.not_equal(joined["Stock"], joined["Stock_prev"]))
+    change = pc.if_else(pc.equal(joined["Stock"], 0), "out of stock", "back in stock")
+    return joined.append_column("Change", change).to_pandas()
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokopedia price history queries")
+    parser.add_argument("query", choices=["history", "drops", "flips"])
+    parser.add_argument("--link", help="product link, for history")
+    parser.add_argument("--date", default=None, help="YYYYMMDD, defaults to the latest crawl")
+    parser.add_argument("--previous", default=None, help="YYYYMMDD to compare against, defaults to the crawl before --date")
+    parser.add_argument("--dealer")
+    parser.add_argument("--category")
+    parser.add_argument("--crawler", help="id_toko or id_toko_playwright, defaults to both")
+    parser.add_argument("--output", help="write the result to this xlsx instead of printing it")
+    args = parser.parse_args()
+
+    dates = toko_dataset.partition_dates()
+    date = args.date or (dates[-1] if dates else None)
+
+    if args.query == "history":
+        if not args.link:
+            parser.error("history needs --link")
+        result = price_history(args.link)
+    elif args.query == "drops":
+        result = price_drops(date, args.previous, args.dealer, args.category, crawler=args.crawler)
+    else:
+        result = stock_flips(date, args.previous, args.dealer, args.category, crawler=args.crawler)
+
+    if result is None:
+        print("No earlier crawl to compare against")
+    elif args.output:
+        result.to_excel(args.output, index=False)
+        print(f"{len(result)} rows written to {args.output}")
+    else:
+        print(result.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+## ===== Importing Libraries =====
+
+import json
+import os
+import time
+from datetime import datetime
+
+## ===== Checkpoint journal settings =====
+
+## one append-only JSONL file per crawler per day, e.g. crawl_journal/20240501_id_toko.jsonl
+JOURNAL_DIR = os.environ.get("TOKO_JOURNAL_DIR", "crawl_journal")
+
+## "off" crawls without checkpoints (nothing is read or written)
+JOURNAL_MODE = os.environ.get("TOKO_JOURNAL_MODE", "on")
+
+## records are written through to the OS at once (a crashed process loses nothing), fsynced at most
+## every this many records or seconds (what a power cut can still take)
+JOURNAL_SYNC_RECORDS = int(os.environ.get("TOKO_JOURNAL_SYNC_RECORDS", 100))
+JOURNAL_SYNC_SECONDS = float(os.environ.get("TOKO_JOURNAL_SYNC_SECONDS", 5))
+
+def _json_default(value):
+    ## numpy scalars from DataFrame rows, dates from the row's Date column
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+## ===== Journal =====
+
+class Journal:
+    """Records finished listing pages and products, so a restarted crawl picks up where it stopped.
+
+    Every record is one JSON line, appended to a file kept open and flushed before the crawl moves on,
+    while fsyncs are batched (see JOURNAL_SYNC_RECORDS) so a record costs no disk wait; a line cut
+    short by a crash is dropped on the next load. Later records for the same key win.
+    """
+
+    def __init__(self, name, date=None):
+        date = date or datetime.now().strftime("%Y%m%d")
+        self.path = os.path.join(JOURNAL_DIR, f"{date}_{name}.jsonl")
+        self.listings = None
+        self.products = None
+        self.page_counts = None
+        self.file = None
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    def load(self):
+        if self.listings is not None:
+            return
+        self.listings = {}
+        self.products = {}
+        self.page_counts = {}
+        if JOURNAL_MODE == "off" or not os.path.exists(self.path):
+            return
+
+        with open(self.path, "rb") as f:
+            content = f.read()
+
+        ## a crash mid-write leaves an unterminated last line: cut it off so new records start clean
+        complete = content[:content.rfind(b"\n") + 1]
+        if len(complete) != len(content):
+            with open(self.path, "r+b") as f:
+                f.truncate(len(complete))
+
+        for line in complete.decode("utf-8").splitlines():
+            if not line:
+                continue
+            record = json.loads(line)
+            if record["type"] == "listing":
+                self.listings[record["key"]] = [record["rows"], record["last"]]
+            elif record["type"] == "product":
+                self.products[record["key"]] = record["rows"]
+            elif record["type"] == "pages":
+                self.page_counts[record["key"]] = record["count"]
+
+        print(f"Resuming from {self.path}: {len(self.listings)} listing pages, {len(self.products)} products done")
+
+    def append(self, record):
+        if JOURNAL_MODE == "off":
+            return
+        if self.file is None:
+            os.makedirs(JOURNAL_DIR, exist_ok=True)
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.write(json.dumps(record, default=_json_default, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+        self.unsynced += 1
+        if self.unsynced >= JOURNAL_SYNC_RECORDS or time.monotonic() - self.synced_at >= JOURNAL_SYNC_SECONDS:
+            self.sync()
+
+    def sync(self):
+        if self.file is not None and self.unsynced:
+            os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    def close(self):
+        """Fsyncs what is left and closes the file; a later record reopens it."""
+        if self.file is None:
+            return
+        self.sync()
+        self.file.close()
+        self.file = None
+
+    ## ----- listing pages -----
+
+    def listing(self, key):
+        """[rows, last] of a finished listing page, or None; `last` marks the page that ended the category."""
+        self.load()
+        return self.listings.get(key)
+
+    def record_listing(self, key, rows, last=False):
+        self.load()
+        self.listings[key] = [rows, last]
+        self.append({"type": "listing", "key": key, "rows": rows, "last": last})
+
+    def page_count(self, key):
+        """Number of pages a listing was found to have on its first page, or None."""
+        self.load()
+        return self.page_counts.get(key)
+
+    def record_page_count(self, key, count):
+        self.load()
+        self.page_counts[key] = count
+        self.append({"type": "pages", "key": key, "count": count})
+
+    ## ----- products -----
+
+    def product(self, key):
+        """Export rows of a finished product, or None."""
+        self.load()
+        return self.products.get(key)
+
+    def record_product(self, key, rows):
+        self.load()
+        self.products[key] = rows
+        self.append({"type": "product", "key": key, "rows": rows})
@@ -0,0 +1,187 @@
+## ===== Importing Libraries =====
+
+import argparse
+import json
+import math
+import os
+import sqlite3
+
+import pandas as pd
+
+## ===== Masterlist settings =====
+
+MASTERLIST_DB = os.environ.get("TOKO_MASTERLIST_DB", "toko_masterlist.sqlite")
+
+## the business users' copy, and where the first run migrates the old masterlist from
+MASTERLIST_XLSX = "toko_masterlist.xlsx"
+
+## rows go in and out of sqlite in chunks of this size
+CHUNK_SIZE = 5000
+
+## one row per dealer/material/link, as the xlsx had variants and same-titled products with their own rows;
+## NEW / MISSING compare on "Dealer Site - Material Description" (match_key) like before
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS masterlist (
+    dealer TEXT NOT NULL,               -- '' when the row has none
+    material TEXT NOT NULL,
+    link TEXT NOT NULL,
+    match_key TEXT,                     -- "Dealer Site - Material Description"
+    last_seen TEXT,
+    data TEXT NOT NULL,                 -- the full row as json, in masterlist column order
+    PRIMARY KEY (dealer, material, link)
+);
+CREATE INDEX IF NOT EXISTS masterlist_match_key ON masterlist (match_key);
+CREATE INDEX IF NOT EXISTS masterlist_last_seen ON masterlist (last_seen);
+CREATE INDEX IF NOT EXISTS masterlist_link ON masterlist (link);
+"""
+
+## ===== Store =====
+
+def masterlist_key(dealer, material):
+    if not isinstance(dealer, str) or not isinstance(material, str):
+        return None
+    return dealer + " - " + material
+
+def plain_value(value):
+    """Makes a cell json friendly: NaN becomes None, timestamps and dates become strings."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, "item"):
+        return plain_value(value.item())
+    return str(value)
+
+def connect(path=None):
+    """Opens the store, migrating toko_masterlist.xlsx into it when the store is new."""
+    path = path or MASTERLIST_DB
+    is_new = not os.path.exists(path)
+
+    conn = sqlite3.connect(path)
+    migrate_schema(conn)
+    conn.executescript(SCHEMA)
+
+    if is_new and os.path.exists(MASTERLIST_XLSX):
+        import_xlsx(conn, MASTERLIST_XLSX)
+        print(f"Masterlist migrated from {MASTERLIST_XLSX} into {path}")
+    return conn
+
+def migrate_schema(conn):
+    """Rebuilds a store made with the old "Dealer - Material" primary key, which kept one row per key."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(masterlist)")]
+    if not columns or "match_key" in columns:
+        return
+    rows = [load_row(seen, data) for seen, data in conn.execute("SELECT last_seen, data FROM masterlist ORDER BY rowid")]
+    with conn:
+        conn.execute("DROP TABLE masterlist")
+    conn.executescript(SCHEMA)
+    upsert(conn, pd.DataFrame(rows), refresh_matching=False)
+    print(f"Masterlist store rebuilt with one row per dealer/material/link ({len(rows)} rows)")
+
+def text_value(value):
+    value = plain_value(value)
+    return "" if value is None else str(value)
+
+def upsert(conn, df, last_seen_column="Last Seen", refresh_matching=True):
+    """Inserts unseen dealer/material/link rows and refreshes `Last Seen` of known ones; the other columns of a known row are kept.
+
+    Like the xlsx masterlist, `Last Seen` is also refreshed on every row sharing a dealer/material key with the
+    new rows (unless refresh_matching is off, as when importing a masterlist as it is).
+    Returns [rows written, duplicate dealer/material/link rows folded into an earlier one].
+    """
+    rows = {}
+    duplicates = 0
+    for record in df.to_dict("records"):
+        record = {column: plain_value(value) for column, value in record.items()}
+        if last_seen_column != "Last Seen":
+            record = {("Last Seen" if column == last_seen_column else column): value for column, value in record.items()}
+        identity = (text_value(record.get("Dealer Site")), text_value(record.get("Material Description")), text_value(record.get("Link")))
+        last_seen = None if record.get("Last Seen") is None else str(record["Last Seen"])
+        key = masterlist_key(record.get("Dealer Site"), record.get("Material Description"))
+        ## the first row of a dealer/material/link is kept, later ones only move its Last Seen
+        if identity in rows:
+            duplicates += 1
+            dealer, material, link, key, _, data = rows[identity]
+            rows[identity] = (dealer, material, link, key, last_seen, data)
+        else:
+            rows[identity] = identity + (key, last_seen, json.dumps(record))
+
+    rows = list(rows.values())
+    refreshed = {}
+    if refresh_matching:
+        for row in rows:
+            if row[3] is not None:
+                refreshed[row[3]] = row[4]
+
+    with conn:
+        for start in range(0, len(rows), CHUNK_SIZE):
+            conn.executemany(
+                """INSERT INTO masterlist (dealer, material, link, match_key, last_seen, data) VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (dealer, material, link) DO UPDATE SET last_seen = excluded.last_seen""",
+                rows[start:start + CHUNK_SIZE],
+            )
+        conn.executemany(
+            "UPDATE masterlist SET last_seen = ? WHERE match_key = ?",
+            [(last_seen, key) for key, last_seen in refreshed.items()],
+        )
+    return len(rows), duplicates
+
+def known_keys(conn, keys):
+    """The subset of `keys` already in the masterlist, one indexed lookup per key."""
+    keys = list(dict.fromkeys(key for key in keys if key is not None))
+    found = set()
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        found.update(row[0] for row in conn.execute(f"SELECT match_key FROM masterlist WHERE match_key IN ({placeholders})", chunk))
+    return found
+
+def all_keys(conn):
+    return [row[0] for row in conn.execute("SELECT DISTINCT match_key FROM masterlist WHERE match_key IS NOT NULL")]
+
+def rows_not_seen_on(conn, last_seen):
+    """[match key, row dict] for every row whose Last Seen is not `last_seen`."""
+    cursor = conn.execute(
+        "SELECT match_key, last_seen, data FROM masterlist WHERE last_seen IS NULL OR last_seen <> ?", (str(last_seen),)
+    )
+    return [[key, load_row(seen, data)] for key, seen, data in cursor]
+
+def load_row(last_seen, data):
+    row = json.loads(data)
+    row["Last Seen"] = last_seen
+    return row
+
+## ===== xlsx import / export =====
+
+def import_xlsx(conn, filename):
+    written, duplicates = upsert(conn, pd.read_excel(filename), refresh_matching=False)
+    if duplicates:
+        print(f"{filename}: {duplicates} rows repeat the dealer/material/link of an earlier row and were folded into it")
+    return written
+
+def to_df(conn):
+    rows = [load_row(seen, data) for seen, data in conn.execute("SELECT last_seen, data FROM masterlist ORDER BY rowid")]
+    return pd.DataFrame(rows)
+
+def export_xlsx(conn, filename=None):
+    filename = filename or MASTERLIST_XLSX
+    df = to_df(conn)
+    df.to_excel(filename, index=False)
+    return len(df)
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokopedia masterlist store")
+    parser.add_argument("command", choices=["export", "import"], help="export the store to xlsx / import an xlsx into it")
+    parser.add_argument("--file", default=MASTERLIST_XLSX)
+    parser.add_argument("--db", default=MASTERLIST_DB)
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == "export":
+        print(f"Exported {export_xlsx(conn, args.file)} rows to {args.file}")
+    else:
+        print(f"Imported {import_xlsx(conn, args.file)} rows from {args.file}")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
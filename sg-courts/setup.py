@@ -2,6 +2,21 @@
 
 import pandas as pd
 import re
+import os
+from urllib.parse import urlsplit, urlunsplit
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+## one copy for both crawlers, in the repo's crawler_common package (pip install -e . from the repo root)
+from crawler_common import BrandMatcher, RecordAccumulator
+
+## "lxml" builds only the listing nodes we query, "html.parser" is the original full parse
+## and is used automatically when lxml is not installed
+try:
+    import lxml
+    PARSER_BACKEND = "lxml"
+except ImportError:
+    PARSER_BACKEND = "html.parser"
 
 import time
 from datetime import datetime
@@ -14,10 +29,37 @@ def convert_numbers(str):
     return re.sub("[^\d\.]", "", str)
 
 
+## ===== Base URL override ===== 
+
+## e.g. COURTS_BASE_URL=http://127.0.0.1:8800 to crawl benchmarks/replay_server.py instead of the live site
+COURTS_BASE_URL = os.environ.get("COURTS_BASE_URL")
+
+def rebase_url(url, base_url=None):
+    """Swaps the scheme and host of url for base_url (keeps path and query), a no-op when unset."""
+    base_url = base_url or COURTS_BASE_URL
+    if not base_url:
+        return url
+
+    parts = urlsplit(url)
+    base = urlsplit(base_url)
+    return urlunsplit((base.scheme, base.netloc, parts.path, parts.query, parts.fragment))
+
+
+## ===== HTML parsing ===== 
+
+## listing page nodes: product cards and the empty-state marker past the last page
+COURTS_LISTING_NODES = SoupStrainer(["li", "div"], class_=["item product product-item", "message info empty"])
+
+def make_soup(html, only=None):
+    if PARSER_BACKEND == "lxml":
+        return BeautifulSoup(html, "lxml", parse_only=only)
+    return BeautifulSoup(html, "html.parser")
+
+
 ## ===== Initialising brand names ===== 
 
 def initialise_brands():
-    global tv_brands, audio_brands, headphone_brands
+    global tv_brands, audio_brands, headphone_brands, brand_matchers
     tv_brands = ["AIWA", "AOC", "HISENSE", "LG", "PHILIPS", "SAMSUNG", "SHARP", "SONY", "TCL", "XIAOMI"]
 
     audio_brands = ["AIWA", "APPLE", "AUDIO TECHNICA", "CREATIVE", "DENON", "HARMAN KARDON", "HISENSE", "HONEYWELL", "JBL", "LG", "MARSHALL",
@@ -27,6 +69,12 @@ def initialise_brands():
                         "IFLYTEK", "JABRA", "JBL", "KLIPSCH", "LOGITECH", "MARSHALL", "NOTHING", "OPPO", "PHILIPS", "SAMSUNG", "SARAMONIC",
                         "SHOKZ", "SKULLCANDY", "SONOS", "SONY", "SOUL", "SUDIO", "TOZO", "TRIBIT"]
 
+    brand_matchers = {
+        "LCD TV": BrandMatcher(tv_brands),
+        "Audio": BrandMatcher(audio_brands),
+        "MDR": BrandMatcher(headphone_brands),
+    }
+
 
 ## ===== Initialising the dataframes ===== 
 
@@ -36,6 +84,8 @@ def initialise_df():
     productDf = pd.DataFrame(columns = columns)
 
 def add_to_df(productDf, newEntry):
+    if productDf.empty:
+        return newEntry.reset_index(drop=True)
     return pd.concat([productDf, newEntry], ignore_index=True)
 
 def setup():
@@ -1,12 +1,28 @@
+## "http" fetches listing pages with aiohttp and only falls back to the browser when blocked
+## "pool" crawls each category on its own browser, "browser" crawls them one by one
+FETCH_MODE = "http"
+OUTPUT_FORMAT = "xlsx"
+
+import argparse
 from datetime import datetime
 
 current_date = datetime.now().strftime("%Y%m%d")
 
 import sg_courts_scrape as scrape
 import sg_courts_parse as parse
+import sg_courts_export as export
+
+parser = argparse.ArgumentParser(description="Scrape Courts SG listing pages")
+parser.add_argument("--mode", choices=["http", "pool", "browser"], default=FETCH_MODE)
+parser.add_argument("--format", choices=list(export.SINKS), default=OUTPUT_FORMAT)
+parser.add_argument("--output", help="defaults to {date}_SG_courts.{format}")
+parser.add_argument("--max-browsers", type=int, default=scrape.COURTS_MAX_BROWSERS, help="Chrome instances at once in pool mode")
+args = parser.parse_args()
+
+FILENAME = args.output or f"{current_date}_SG_courts.{args.format}"
 
-courts_html_list = scrape.scrape()
-courts_df = parse.parse(courts_html_list)
+## pages are parsed as they arrive and every row goes straight to the output file
+courts_rows = parse.iter_rows(scrape.stream_pages(args.mode, args.max_browsers))
+row_count = export.write_rows(courts_rows, args.format, FILENAME, parse.setup.columns)
 
-FILENAME = f"{current_date}_SG_courts.xlsx"
-courts_df.to_excel(FILENAME, index=False)
\ No newline at end of file
+print(f"{row_count} products written to {FILENAME}")
@@ -0,0 +1,106 @@
+## ===== Import libraries =====
+import csv
+
+## ===== Output sinks =====
+## Each sink takes rows one at a time (in setup.columns order) as parse produces them,
+## so the full result set never has to sit in a DataFrame before it is written.
+
+class XlsxSink:
+    """Constant-memory xlsx writer: every row is flushed to disk once the next one starts."""
+
+    def __init__(self, filename, columns):
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(filename, {
+            "constant_memory": True,
+            "default_date_format": "yyyy-mm-dd",
+        })
+        self.worksheet = self.workbook.add_worksheet("Sheet1")
+        header_format = self.workbook.add_format({"bold": True, "border": 1, "align": "center"})
+        self.worksheet.write_row(0, 0, columns, header_format)
+        self.row_index = 1
+
+    def write(self, row):
+        self.worksheet.write_row(self.row_index, 0, row)
+        self.row_index += 1
+
+    def close(self):
+        self.workbook.close()
+
+class CsvSink:
+    def __init__(self, filename, columns):
+        self.file = open(filename, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+class ParquetSink:
+    """Buffers rows into column batches and appends each batch as a Parquet row group."""
+
+    BATCH_SIZE = 10000
+
+    def __init__(self, filename, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.columns = columns
+        ## declared up front so a batch with e.g. no brand found doesn't change the file schema
+        column_types = {
+            "Stock": pa.bool_(),
+            "Date": pa.date32(),
+            "Model Position": pa.int64(),
+        }
+        self.schema = pa.schema([(col, column_types.get(col, pa.string())) for col in columns])
+        self.writer = pq.ParquetWriter(filename, self.schema)
+        self.buffer = [[] for _ in columns]
+
+    def write(self, row):
+        for values, value in zip(self.buffer, row):
+            values.append(value)
+
+        if len(self.buffer[0]) >= self.BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer[0]:
+            return
+        batch = self.pa.Table.from_arrays(
+            [self.pa.array(values, type=field.type) for values, field in zip(self.buffer, self.schema)],
+            schema=self.schema,
+        )
+        self.writer.write_table(batch)
+        self.buffer = [[] for _ in self.columns]
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+SINKS = {
+    "xlsx": XlsxSink,
+    "csv": CsvSink,
+    "parquet": ParquetSink,
+}
+
+def open_sink(output_format, filename, columns):
+    if output_format not in SINKS:
+        raise ValueError(f"Unknown output format: {output_format} (choose from {', '.join(SINKS)})")
+    return SINKS[output_format](filename, columns)
+
+def write_rows(rows, output_format, filename, columns):
+    """Writes rows straight through to the chosen sink, returns the number of rows written."""
+    sink = open_sink(output_format, filename, columns)
+    row_count = 0
+    try:
+        for row in rows:
+            sink.write(row)
+            row_count += 1
+    finally:
+        sink.close()
+
+    return row_count
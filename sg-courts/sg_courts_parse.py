@@ -15,7 +15,72 @@ import setup
 setup.setup()
 
 ## ===== Parsing the HTML =====
-def parse(html_list):
+def parse_page(product_list, category, courts_product_dict):
+    """Yields one row (in setup.columns order) per product on a listing page."""
+
+    for pdt in product_list:
+
+    
+        ## ===== GETTING TITLE & LINK=====
+        title_elm = pdt.find("h3", class_="product name product-item-name")
+
+        if not title_elm:
+            continue
+
+        if category not in courts_product_dict:
+            courts_product_dict[category] = 1
+        else:
+            courts_product_dict[category] += 1
+
+        title = title_elm.text.strip()
+        # print(title)
+
+        link_elm = pdt.find("a", class_ = "product-item-link", href=True)['href']
+
+        ## ===== GETTING BRAND =====
+        brand = setup.brand_matchers[category].match(title, link_elm)
+
+        ## ===== GETTING STOCK =====
+        error_message = pdt.find("div", class_="stock unavailable")
+
+        if error_message:
+            stock = False
+            # print("NO STOCK")
+        else:
+            stock = True
+        
+        ## ===== GETTING PRICE =====
+        price_box_elm = pdt.find("div", class_="price-box price-final_price")
+        special_price_elm = price_box_elm.find("span", class_ = "special-price")
+
+        if special_price_elm:
+            special_price = special_price_elm.find("span", class_ = "price").text.strip()
+            # print("special price: " + str(special_price))
+
+            original_price = price_box_elm.find("span", class_ = "old-price").find("span", class_ = "price").text.strip()
+            # print("original price: " + str(original_price))
+
+            yield [brand, title, category, "SGD", setup.convert_numbers(special_price), setup.convert_numbers(original_price), 
+                    stock, current_date, "COURTS", link_elm, courts_product_dict[category]]
+            
+        else:
+            only_one_price = price_box_elm.find("span", class_ = "price").text.strip()
+            # print("=> ONLY ONE price: " + str(only_one_price))
+            yield [brand, title, category, "SGD", setup.convert_numbers(only_one_price), setup.convert_numbers(only_one_price), 
+                    stock, current_date, "COURTS", link_elm, courts_product_dict[category]]
+
+def release_page(product_list):
+    """Breaks up the page's parse tree so it is freed straight away instead of waiting for the cyclic GC."""
+    if not product_list:
+        return
+
+    root = product_list[0]
+    while root.parent is not None:
+        root = root.parent
+    root.decompose()
+
+def iter_rows(html_list):
+    """Yields rows page by page; html_list can be a list or a stream of [parsed_products, category] pairs."""
 
     courts_product_dict = {}
 
@@ -23,77 +88,16 @@ def parse(html_list):
         product_list = pair[0]
         category = pair[1]
 
-        for pdt in product_list:
+        yield from parse_page(product_list, category, courts_product_dict)
 
-        
-            ## ===== GETTING TITLE & LINK=====
-            title_elm = pdt.find("h3", class_="product name product-item-name")
-
-            if not title_elm:
-                continue
-
-            if category not in courts_product_dict:
-                courts_product_dict[category] = 1
-            else:
-                courts_product_dict[category] += 1
-
-            title = title_elm.text.strip()
-            # print(title)
-
-            link_elm = pdt.find("a", class_ = "product-item-link", href=True)['href']
-
-            ## ===== GETTING BRAND =====
-            if category == "LCD TV":
-                brand_list = setup.tv_brands
-            elif category == "Audio":
-                brand_list = setup.audio_brands
-            elif category == "MDR":
-                brand_list = setup.headphone_brands
-                
-            brand = None
-
-            for b in brand_list:
-                if b.lower() == "AUDIO TECHNICA":
-                    if "audio-technica" in title.lower() or "audio-technica" in link_elm.lower():
-                        brand = b
-                        break
-                elif b.lower() in title.lower() or b.lower() in link_elm.lower():
-                    brand = b
-                    break
-
-            ## ===== GETTING STOCK =====
-            error_message = pdt.find("div", class_="stock unavailable")
-
-            if error_message:
-                stock = False
-                # print("NO STOCK")
-            else:
-                stock = True
-            
-            ## ===== GETTING PRICE =====
-            price_box_elm = pdt.find("div", class_="price-box price-final_price")
-            special_price_elm = price_box_elm.find("span", class_ = "special-price")
-
-            if special_price_elm:
-                special_price = special_price_elm.find("span", class_ = "price").text.strip()
-                # print("special price: " + str(special_price))
-
-                original_price = price_box_elm.find("span", class_ = "old-price").find("span", class_ = "price").text.strip()
-                # print("original price: " + str(original_price))
-
-                newEntry = pd.DataFrame([
-                    [brand, title, category, "SGD", setup.convert_numbers(special_price), setup.convert_numbers(original_price), 
-                        stock, current_date, "COURTS", link_elm, courts_product_dict[category]]
-                ], columns = setup.columns)
-                
-            else:
-                only_one_price = price_box_elm.find("span", class_ = "price").text.strip()
-                # print("=> ONLY ONE price: " + str(only_one_price))
-                newEntry = pd.DataFrame([
-                    [brand, title, category, "SGD", setup.convert_numbers(only_one_price), setup.convert_numbers(only_one_price), 
-                        stock, current_date, "COURTS", link_elm, courts_product_dict[category]]
-                ], columns = setup.columns)
-
-            setup.productDf = setup.add_to_df(setup.productDf, newEntry)
+        release_page(product_list)
+
+def parse(html_list):
+
+    records = setup.RecordAccumulator(setup.columns)
+    for row in iter_rows(html_list):
+        records.append(row)
+
+    setup.productDf = setup.add_to_df(setup.productDf, records.to_df())
 
     return setup.productDf
\ No newline at end of file
@@ -8,13 +8,21 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.chrome.options import Options
 
-from bs4 import BeautifulSoup
 import time
 import pyfiglet
 
 import io
 import sys
 
+import asyncio
+import aiohttp
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import setup
+
 ## ===== Pre-scrape initialisations =====
 courts_links = [
     ["https://www.courts.com.sg/tv-entertainment/vision/television?p=", "LCD TV"],
@@ -24,8 +32,33 @@ courts_links = [
 
 COURTS_PRODUCT_LIMIT = "&product_list_limit=32"
 
-## ===== Scrapping the website =====
-def scrape():
+## ceiling (seconds) for a page to show its product grid or empty marker
+COURTS_READY_TIMEOUT = 15
+COURTS_READY_SELECTORS = ["li.item.product.product-item", "div.message.info.empty"]
+
+## fixed sleep the readiness wait replaced, used to report the time saved
+COURTS_FIXED_WAIT = 5
+
+## [category, page, seconds until ready, ready] for every page loaded in the browser
+page_ready_log = []
+
+## pages allowed to wait for the parser before scraping pauses
+COURTS_QUEUE_SIZE = 4
+
+## Chrome instances allowed at once in pool mode (one category per worker)
+COURTS_MAX_BROWSERS = 3
+
+## pages requested at once per category in HTTP mode
+COURTS_HTTP_CONCURRENCY = 8
+COURTS_HTTP_TIMEOUT = 30
+COURTS_HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.88 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-SG,en;q=0.9",
+}
+
+## ===== Scrapping helper functions =====
+def start_driver():
     options = webdriver.ChromeOptions() 
     options.add_argument('--disable-extensions')
     options.add_argument('--proxy-server="direct://"')
@@ -34,44 +67,50 @@ def scrape():
     driver = webdriver.Chrome(options=options) 
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})") 
 
-    courts_html_list = []
-    courts_print_report = []
+    return driver
 
-    for x in courts_links:
-        link = x[0]
-        category = x[1]
+def wait_until_ready(driver, timeout=COURTS_READY_TIMEOUT):
+    """Waits for the product grid or the empty-state marker, returns (seconds taken, ready)."""
+    start = time.perf_counter()
+    try:
+        WebDriverWait(driver, timeout).until(EC.any_of(
+            *[EC.presence_of_element_located((By.CSS_SELECTOR, selector)) for selector in COURTS_READY_SELECTORS]
+        ))
+        ready = True
+    except TimeoutException:
+        ready = False
 
-        counter = 0
+    return time.perf_counter() - start, ready
 
-        while True:
-            counter += 1
-            driver.get(link + str(counter) + COURTS_PRODUCT_LIMIT)
-            time.sleep(5)
+def load_page(driver, url, category, page):
+    driver.get(setup.rebase_url(url))
+    ready_time, ready = wait_until_ready(driver)
 
-            ## check if there are items
-            html = driver.page_source
-            soup = BeautifulSoup(html, 'html.parser')
+    page_ready_log.append([category, page, ready_time, ready])
+    if not ready:
+        print(f"  WARNING: {category} Page {page} not ready after {COURTS_READY_TIMEOUT}s, reading anyway")
 
-            error_message = soup.find("div", class_="message info empty")
-            
-            if error_message:
-                print("  ERROR FOUND: " + error_message.text)
-                print("  Exiting category...\n")
-                break
-            
-            parsed_products = soup.find_all("li", class_ = "item product product-item")
+    return driver.page_source
 
-            courts_html_list += [
-                [parsed_products, category]
-            ]
-            print(f">> {category} Page {counter} parsed!")
-        
-        courts_print_report += [
-            [category, counter]
-        ]
+def read_page(html):
+    """Classifies a listing page as "products", "empty" (past the last page) or "blocked"."""
+    if not html:
+        return "blocked", None, None
 
-    driver.quit()
+    soup = setup.make_soup(html, setup.COURTS_LISTING_NODES)
 
+    error_message = soup.find("div", class_="message info empty")
+    if error_message:
+        return "empty", None, error_message.text
+
+    parsed_products = soup.find_all("li", class_ = "item product product-item")
+    if not parsed_products:
+        ## no grid and no empty marker => captcha / access denied / half-rendered page
+        return "blocked", None, None
+
+    return "products", parsed_products, None
+
+def print_report(courts_print_report):
     page_counter = 0
     print()
     print("+--------------------------------+")
@@ -82,7 +121,218 @@ def scrape():
 
     print()
     print(f"==> TOTAL pages parsed: {page_counter}")
+
+    if page_ready_log:
+        ready_times = [x[2] for x in page_ready_log]
+        not_ready = sum(1 for x in page_ready_log if not x[3])
+        saved = sum(COURTS_FIXED_WAIT - t for t in ready_times)
+        print()
+        print(f"Browser pages loaded: {len(ready_times)} ({not_ready} hit the {COURTS_READY_TIMEOUT}s ceiling)")
+        print(f"Time to ready: avg {sum(ready_times) / len(ready_times):.2f}s, max {max(ready_times):.2f}s")
+        print(f"Saved vs fixed {COURTS_FIXED_WAIT}s sleep: {saved:.1f}s")
     print("+--------------------------------+")
 
+## ===== Scrapping the website =====
+def scrape_category(driver, link, category, on_page):
+    """Walks a category's pages until the empty marker, returns the page counter for the report."""
+    counter = 0
+
+    while True:
+        counter += 1
+        html = load_page(driver, link + str(counter) + COURTS_PRODUCT_LIMIT, category, counter)
+
+        ## check if there are items
+        soup = setup.make_soup(html, setup.COURTS_LISTING_NODES)
+
+        error_message = soup.find("div", class_="message info empty")
+        
+        if error_message:
+            print("  ERROR FOUND: " + error_message.text)
+            print("  Exiting category...\n")
+            break
+        
+        parsed_products = soup.find_all("li", class_ = "item product product-item")
+
+        on_page([parsed_products, category])
+        print(f">> {category} Page {counter} parsed!")
+
+    return counter
+
+def scrape(on_page=None):
+    driver = start_driver()
+
+    courts_html_list = []
+    if on_page is None:
+        on_page = courts_html_list.append
+    courts_print_report = []
+
+    for x in courts_links:
+        link = x[0]
+        category = x[1]
+
+        counter = scrape_category(driver, link, category, on_page)
+        
+        courts_print_report += [
+            [category, counter]
+        ]
+
+    driver.quit()
+
+    print_report(courts_print_report)
+
+    return courts_html_list
+
+## ===== Scrapping categories in parallel =====
+def scrape_parallel(on_page=None, max_browsers=COURTS_MAX_BROWSERS):
+    """Crawls every category on its own worker, with at most max_browsers Chrome instances alive."""
+    courts_html_list = []
+    if on_page is None:
+        on_page = courts_html_list.append
+
+    ## browsers are started on demand and handed back to the pool after each category
+    driver_pool = queue.Queue()
+    drivers = []
+    drivers_lock = threading.Lock()
+
+    def checkout_driver():
+        try:
+            return driver_pool.get_nowait()
+        except queue.Empty:
+            driver = start_driver()
+            with drivers_lock:
+                drivers.append(driver)
+            return driver
+
+    def crawl(x):
+        driver = checkout_driver()
+        try:
+            return scrape_category(driver, x[0], x[1], on_page)
+        finally:
+            driver_pool.put(driver)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_browsers) as executor:
+            counters = list(executor.map(crawl, courts_links))
+    finally:
+        for driver in drivers:
+            driver.quit()
+
+    courts_print_report = [[x[1], counter] for x, counter in zip(courts_links, counters)]
+    print_report(courts_print_report)
+
+    return courts_html_list
+
+## ===== Scrapping the website over HTTP =====
+async def fetch_page(session, semaphore, url):
+    async with semaphore:
+        try:
+            async with session.get(setup.rebase_url(url)) as response:
+                if response.status != 200:
+                    return None
+                return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+
+async def scrape_http_async(on_page=None):
+    """Fetches listing pages with a pooled aiohttp session, falling back to Selenium for blocked pages."""
+    courts_html_list = []
+    if on_page is None:
+        on_page = courts_html_list.append
+    courts_print_report = []
+
+    ## the browser is only started if a page has to fall back to it
+    driver = None
+
+    semaphore = asyncio.Semaphore(COURTS_HTTP_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit=COURTS_HTTP_CONCURRENCY)
+    timeout = aiohttp.ClientTimeout(total=COURTS_HTTP_TIMEOUT)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=COURTS_HTTP_HEADERS) as session:
+        for x in courts_links:
+            link = x[0]
+            category = x[1]
+
+            counter = 0
+            category_done = False
+
+            ## request the next batch of pages together, stop at the first empty one
+            while not category_done:
+                urls = [link + str(counter + i) + COURTS_PRODUCT_LIMIT for i in range(1, COURTS_HTTP_CONCURRENCY + 1)]
+                html_batch = await asyncio.gather(*[fetch_page(session, semaphore, url) for url in urls])
+
+                for url, html in zip(urls, html_batch):
+                    counter += 1
+                    status, parsed_products, error_text = read_page(html)
+
+                    if status == "blocked":
+                        print(f"  Page {counter} blocked over HTTP, retrying with browser...")
+                        if driver is None:
+                            driver = start_driver()
+                        status, parsed_products, error_text = read_page(load_page(driver, url, category, counter))
+
+                    if status == "empty":
+                        print("  ERROR FOUND: " + error_text)
+                        print("  Exiting category...\n")
+                        category_done = True
+                        break
+
+                    if status == "blocked":
+                        print(f"  ERROR: Page {counter} still blocked in browser")
+                        print("  Exiting category...\n")
+                        category_done = True
+                        break
+
+                    on_page([parsed_products, category])
+                    print(f">> {category} Page {counter} parsed!")
+
+            courts_print_report += [
+                [category, counter]
+            ]
+
+    if driver is not None:
+        driver.quit()
+
+    print_report(courts_print_report)
+
+    return courts_html_list
+
+def scrape_http(on_page=None):
+    return asyncio.run(scrape_http_async(on_page))
+
+## ===== Streaming pages to the parser =====
+def stream_pages(mode="http", max_browsers=COURTS_MAX_BROWSERS):
+    """Yields [parsed_products, category] pairs as soon as each page is scraped.
+
+    Scraping runs in a background thread and hands pages over through a
+    bounded queue, so parsing overlaps with network wait and only a few
+    pages are held in memory at any time.
+    """
+    page_queue = queue.Queue(maxsize=COURTS_QUEUE_SIZE)
+    done = object()
+    errors = []
+
+    def producer():
+        try:
+            if mode == "http":
+                scrape_http(on_page=page_queue.put)
+            elif mode == "pool":
+                scrape_parallel(on_page=page_queue.put, max_browsers=max_browsers)
+            else:
+                scrape(on_page=page_queue.put)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            page_queue.put(done)
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+
+    while True:
+        pair = page_queue.get()
+        if pair is done:
+            break
+        yield pair
 
-    return courts_html_list
\ No newline at end of file
+    thread.join()
+    if errors:
+        raise errors[0]
\ No newline at end of file